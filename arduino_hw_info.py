@@ -5,18 +5,1107 @@ This script replicates the functionality of the C# ArduinoHwInfo application on
 It collects hardware information and sends it to an Arduino via serial communication.
 """
 
+import os
 import time
 import serial
-import subprocess
 import re
 import threading
 import signal
+import struct
 import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+from functools import reduce
+from heapq import nlargest
+from itertools import repeat
+from operator import add, mul, sub, truediv
 from pathlib import Path
 
 
-class HardwareMonitor:
+HWMON_ROOT = '/sys/class/hwmon'
+
+# hwmon label patterns mirroring the regexes applied to the 'sensors' output
+HWMON_TCTL_LABEL = 'Tctl'
+HWMON_LABEL_PATTERNS = [
+    re.compile(r'Package'),  # Package temperature
+    re.compile(r'Core [0-9]+'),  # Core temperatures
+    re.compile(r'CPU Temp'),  # CPU temperature
+    re.compile(r'cpu_thermal'),  # CPU thermal
+    re.compile(r'acpi'),  # ACPI thermal
+    re.compile(r'CPUTIN'),  # CPU temperature from hardware monitor
+    re.compile(r'TSI0_TEMP'),  # Additional thermal sensors
+    re.compile(r'TSI1_TEMP'),  # Additional thermal sensors
+]
+
+
+def read_fd(fd, size=64):
+    """Re-read a small sysfs/procfs file from the start without reopening it."""
+    return os.pread(fd, size, 0)
+
+
+def close_fds(fds):
+    """Close a list of file descriptors, ignoring errors."""
+    for fd in fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    del fds[:]
+
+
+class HwmonTemperatureReader:
+    """Read CPU temperatures directly from /sys/class/hwmon."""
+
+    def __init__(self, root=HWMON_ROOT):
+        self.root = root
+        self.tctl_fds = []
+        self.other_fds = []
+        self.discovered = False
+
+    def discover(self):
+        """Find the Tctl/Package/Core channels once and keep them open."""
+        self.close()
+        for hwmon in sorted(Path(self.root).glob('hwmon*')):
+            for input_path in sorted(hwmon.glob('temp*_input')):
+                label_path = hwmon / input_path.name.replace('_input', '_label')
+                try:
+                    label = label_path.read_text().strip()
+                except OSError:
+                    continue  # Unlabelled channels never match the sensors patterns
+
+                if label == HWMON_TCTL_LABEL:
+                    fds = self.tctl_fds
+                elif any(pattern.search(label) for pattern in HWMON_LABEL_PATTERNS):
+                    fds = self.other_fds
+                else:
+                    continue
+
+                try:
+                    fds.append(os.open(str(input_path), os.O_RDONLY))
+                except OSError:
+                    continue
+        self.discovered = True
+
+    def close(self):
+        """Close all open channel descriptors."""
+        close_fds(self.tctl_fds)
+        close_fds(self.other_fds)
+        self.discovered = False
+
+    def read(self):
+        """Return the CPU temperature using the same selection rules as 'sensors'."""
+        if not self.discovered:
+            self.discover()
+
+        try:
+            # Tctl first, as for AMD CPUs it is the requested temperature
+            for fd in self.tctl_fds:
+                return int(read_fd(fd)) / 1000.0  # Convert from millidegrees
+
+            # Otherwise the highest temperature from the remaining channels
+            temps = [int(read_fd(fd)) / 1000.0 for fd in self.other_fds]
+            if temps:
+                return max(temps)
+        except (OSError, ValueError):
+            # Sensor disappeared (e.g. driver reload), rediscover on next read
+            self.close()
+
+        return None
+
+
+THERMAL_ROOT = '/sys/class/thermal'
+THERMAL_CPU_KEYWORDS = ['cpu', 'package', 'core']
+
+
+class ThermalZoneIndex:
+    """Index of the CPU-related thermal zones, built once with their temp files kept open."""
+
+    def __init__(self, root=THERMAL_ROOT):
+        self.root = root
+        self.zones = []  # (type name, fd) of CPU-related zones
+        self.scanned = False
+
+    def scan(self):
+        """List the thermal zones and open the temp file of CPU-related ones."""
+        self.invalidate()
+        for zone in sorted(Path(self.root).glob('thermal_zone*')):
+            try:
+                type_name = (zone / 'type').read_text().strip()
+            except OSError:
+                continue
+
+            # Check for CPU-related thermal zones
+            if any(keyword in type_name.lower() for keyword in THERMAL_CPU_KEYWORDS):
+                try:
+                    self.zones.append((type_name, os.open(str(zone / 'temp'), os.O_RDONLY)))
+                except OSError:
+                    continue
+        self.scanned = True
+
+    def invalidate(self):
+        """Drop the index; the next read will rescan /sys/class/thermal."""
+        close_fds([fd for _, fd in self.zones])
+        self.zones = []
+        self.scanned = False
+
+    def read(self):
+        """Return the highest CPU zone temperature, or None."""
+        if not self.scanned:
+            self.scan()
+
+        try:
+            cpu_temp = 0
+            for _, fd in self.zones:
+                cpu_temp = max(cpu_temp, int(read_fd(fd, 32)) / 1000.0)  # Convert from millidegrees
+        except (OSError, ValueError):
+            # Zone went away, rescan on the next read
+            self.invalidate()
+            return None
+
+        return cpu_temp if cpu_temp > 0 else None
+
+
+CPU_SYSFS_ROOT = '/sys/devices/system/cpu'
+
+
+def parse_cpu_list(text):
+    """Parse a kernel CPU list such as '0-3,5,7-8' into a list of CPU numbers."""
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+class CpuFreqSampler:
+    """Read scaling_cur_freq of every online CPU through cached descriptors.
+
+    The online CPU list is re-read with a single pread each sample, and the
+    descriptors are only rebuilt when it changes (CPU hotplug).
+    """
+
+    def __init__(self, root=CPU_SYSFS_ROOT):
+        self.root = root
+        self.online_fd = None
+        self.online = None
+        self.cpus = []
+        self.fds = []
+
+    def discover(self, cpus):
+        """Open scaling_cur_freq for the given CPUs."""
+        close_fds(self.fds)
+        self.cpus = []
+        for cpu in cpus:
+            try:
+                self.fds.append(os.open(f"{self.root}/cpu{cpu}/cpufreq/scaling_cur_freq", os.O_RDONLY))
+                self.cpus.append(cpu)
+            except OSError:
+                continue  # No cpufreq for this CPU
+
+    def check_online(self):
+        """Rediscover the CPUs if the online list changed since the last sample."""
+        if self.online_fd is None:
+            try:
+                self.online_fd = os.open(f"{self.root}/online", os.O_RDONLY)
+            except OSError:
+                # No hotplug information, probe the cpuN directories once
+                if self.online is None:
+                    self.online = b''
+                    self.discover(sorted(int(p.name[3:]) for p in Path(self.root).glob('cpu[0-9]*')))
+                return
+
+        online = read_fd(self.online_fd, 4096)
+        if online != self.online:
+            self.online = online
+            self.discover(parse_cpu_list(online.decode()))
+
+    def sample(self):
+        """Return the current frequency of every online CPU in GHz."""
+        self.check_online()
+        return [int(read_fd(fd, 32)) / 1000000.0 for fd in self.fds]  # Convert kHz to GHz
+
+    def close(self):
+        """Close all descriptors."""
+        close_fds(self.fds)
+        if self.online_fd is not None:
+            close_fds([self.online_fd])
+            self.online_fd = None
+        self.online = None
+
+
+NVIDIA_SMI_QUERY = ('--query-gpu=temperature.gpu,utilization.gpu,utilization.memory,'
+                    'memory.used,memory.total,clocks.gr,clocks.mem')
+
+
+def parse_nvidia_smi_line(line):
+    """Parse one CSV line of nvidia-smi output into a GPU sample dict."""
+    parts = line.strip().split(', ')
+    if len(parts) < 7:
+        return None
+    try:
+        return {
+            'temp': float(parts[0]),  # Temperature
+            'load': float(parts[1]),  # GPU utilization
+            'mem_util': float(parts[2]),  # Memory utilization
+            'vram_used': float(parts[3]),  # Memory used
+            'vram_total': float(parts[4]),  # Memory total
+            'core_clock': int(float(parts[5])),  # Graphics clock (as integer)
+            'mem_clock': int(float(parts[6])),  # Memory clock (as integer)
+        }
+    except ValueError:
+        # e.g. "[N/A]" fields while the driver is busy
+        return None
+
+
+class NvidiaSmiStream:
+    """Long-lived 'nvidia-smi -lms' child whose CSV output is parsed on a background thread."""
+
+    def __init__(self, interval=1000, max_restart_delay=30.0):
+        self.interval = interval
+        self.max_restart_delay = max_restart_delay
+        self.process = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.sample = None
+        self.sample_time = None
+        self.restarts = 0
+        self.running = False
+        self.stop_event = threading.Event()  # Cuts the restart backoff short on stop()
+        self.spawn_lock = threading.Lock()  # stop() never misses a child being spawned
+        self.generation = 0  # A reader left over from before a restart exits on its own
+
+    def start(self):
+        """Start the reader thread (which spawns the nvidia-smi child)."""
+        with self.spawn_lock:
+            if self.running:
+                return
+            self.running = True
+            self.generation += 1
+            self.stop_event.clear()
+        self.thread = threading.Thread(target=self._reader, args=(self.generation,), name='nvidia-smi-stream',
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the reader thread and terminate the child; start() may be called again afterwards."""
+        with self.spawn_lock:
+            self.running = False
+            self.stop_event.set()
+            process = self.process
+        if process and process.poll() is None:
+            try:
+                process.terminate()
+                process.wait(timeout=2)
+            except Exception:
+                process.kill()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    def _reader(self, generation):
+        """Spawn nvidia-smi, parse its lines and restart it whenever it dies."""
+        import subprocess
+        restart_delay = 1.0
+        while True:
+            started = time.monotonic()
+            try:
+                with self.spawn_lock:
+                    if not self.running or generation != self.generation:
+                        break
+                    process = self.process = subprocess.Popen(
+                        ['nvidia-smi', NVIDIA_SMI_QUERY, '--format=csv,noheader,nounits',
+                         '-lms', str(int(self.interval))],
+                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+                for line in process.stdout:
+                    sample = parse_nvidia_smi_line(line)
+                    if sample is not None:
+                        with self.lock:
+                            self.sample = sample
+                            self.sample_time = time.monotonic()
+                process.wait()
+            except OSError:
+                # nvidia-smi not available (yet), keep retrying with backoff
+                pass
+
+            if not self.running or generation != self.generation:
+                break
+            self.restarts += 1
+
+            # Back off if the child keeps dying right away
+            if time.monotonic() - started > 5 * restart_delay:
+                restart_delay = 1.0
+            self.stop_event.wait(restart_delay)
+            restart_delay = min(restart_delay * 2, self.max_restart_delay)
+
+    def latest(self):
+        """Return the newest sample and its age in seconds, without blocking on the child."""
+        with self.lock:
+            if self.sample is None:
+                return None, None
+            return self.sample, time.monotonic() - self.sample_time
+
+
+DRM_ROOT = '/sys/class/drm'
+DRM_CARD_NAME = re.compile(r'card[0-9]+$')  # Skips connectors such as card0-DP-1
+DPM_ACTIVE_CLOCK = re.compile(r'(\d+)\s*mhz', re.IGNORECASE)
+GPU_BACKENDS = ['auto', 'nvidia', 'amdgpu', 'intel', 'none']
+
+
+def open_optional(path):
+    """Open a sysfs file read-only, or return None if the driver does not provide it."""
+    try:
+        return os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return None
+
+
+def read_int_fd(fd, size=32):
+    """pread an integer attribute, 0 if the descriptor is missing."""
+    return int(read_fd(fd, size)) if fd is not None else 0
+
+
+def parse_dpm_clock(text):
+    """Return the MHz of the active ('*') level of a pp_dpm_sclk/pp_dpm_mclk table, or 0."""
+    for line in text.splitlines():
+        if line.rstrip().endswith('*'):
+            match = DPM_ACTIVE_CLOCK.search(line)
+            if match:
+                return int(match.group(1))
+    return 0
+
+
+def find_hwmon_temp(device):
+    """Return the path of the first temp1_input below a DRM device's hwmon directory, or None."""
+    for hwmon in sorted(Path(device).glob('hwmon/hwmon*')):
+        path = hwmon / 'temp1_input'
+        if path.exists():
+            return path
+    return None
+
+
+class GpuBackend:
+    """Source of GPU samples (dicts in the parse_nvidia_smi_line format); this base reports nothing."""
+
+    name = 'none'
+
     def __init__(self):
+        self.sample_age = None  # Seconds since the last returned sample was taken
+
+    def describe(self):
+        return self.name
+
+    def read(self):
+        """Return a new GPU sample, or None to keep the current values."""
+        return None
+
+    def close(self):
+        """Release descriptors and stop background readers (until the next read)."""
+
+    def pause(self):
+        """Stop background readers until resume() (every display off); descriptors are just closed."""
+        self.close()
+
+    def resume(self):
+        """Restart what pause() stopped."""
+
+
+class NvidiaSmiBackend(GpuBackend):
+    """NVIDIA GPUs through nvidia-smi, one process per read or a persistent stream."""
+
+    name = 'nvidia'
+
+    def __init__(self, stream_interval=None):
+        super().__init__()
+        self.stream = None
+        self.paused = False
+        if stream_interval:
+            self.stream = NvidiaSmiStream(interval=stream_interval)
+            self.stream.start()
+
+    def read(self):
+        if self.stream:
+            if self.paused:
+                return None  # Only resume() restarts the stream, not a read that raced with pause()
+            # Streaming mode: just pick up the newest sample from the reader thread
+            sample, self.sample_age = self.stream.latest()
+            return sample
+
+        import subprocess
+        try:
+            result = subprocess.run(['nvidia-smi', NVIDIA_SMI_QUERY, '--format=csv,noheader,nounits'],
+                                    capture_output=True, text=True, timeout=5)
+            output = result.stdout.strip()
+            if result.returncode == 0 and output:
+                sample = parse_nvidia_smi_line(output.splitlines()[0])
+                if sample is not None:
+                    self.sample_age = 0.0
+                return sample
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            # nvidia-smi went away, GPU info will keep its last values
+            pass
+        except Exception:
+            pass
+        return None
+
+    def close(self):
+        if self.stream:
+            self.stream.stop()
+
+    def pause(self):
+        self.paused = True
+        self.close()
+
+    def resume(self):
+        self.paused = False
+        if self.stream:
+            self.stream.start()
+
+
+class SysfsGpuBackend(GpuBackend):
+    """GPU backend polling the sysfs attributes of one DRM card through cached descriptors.
+
+    Subclasses open their attributes in open() and pread them in sample();
+    a failing read closes everything and the attributes are reopened on the
+    next read (e.g. after a driver reload).
+    """
+
+    def __init__(self, card):
+        super().__init__()
+        self.card = Path(card)
+        self.device = self.card / 'device'
+        self.fds = []
+        self.opened = False
+
+    def describe(self):
+        return f"{self.name} ({self.card.name})"
+
+    def open_attribute(self, path):
+        """Open one attribute and remember its descriptor for close()."""
+        fd = open_optional(path)
+        if fd is not None:
+            self.fds.append(fd)
+        return fd
+
+    def open(self):
+        """Open the attributes read by sample()."""
+
+    def sample(self):
+        """Return a GPU sample read from the open attributes."""
+        return None
+
+    def read(self):
+        if not self.opened:
+            self.open()
+            self.opened = True
+        try:
+            sample = self.sample()
+        except (OSError, ValueError):
+            self.close()
+            return None
+        self.sample_age = 0.0
+        return sample
+
+    def close(self):
+        close_fds(self.fds)
+        self.opened = False
+
+
+class AmdgpuBackend(SysfsGpuBackend):
+    """AMD GPUs through the amdgpu driver's sysfs attributes."""
+
+    name = 'amdgpu'
+
+    def open(self):
+        self.busy_fd = self.open_attribute(self.device / 'gpu_busy_percent')
+        self.vram_used_fd = self.open_attribute(self.device / 'mem_info_vram_used')
+        self.sclk_fd = self.open_attribute(self.device / 'pp_dpm_sclk')
+        self.mclk_fd = self.open_attribute(self.device / 'pp_dpm_mclk')
+        temp_path = find_hwmon_temp(self.device)
+        self.temp_fd = self.open_attribute(temp_path) if temp_path else None
+
+        # The VRAM size never changes, read it once
+        try:
+            self.vram_total = int((self.device / 'mem_info_vram_total').read_text()) / 1048576.0
+        except (OSError, ValueError):
+            self.vram_total = 0.0
+
+    def sample(self):
+        return {
+            'temp': read_int_fd(self.temp_fd) / 1000.0,  # Convert from millidegrees
+            'load': float(read_int_fd(self.busy_fd)),
+            'mem_util': 0.0,  # Not exported by amdgpu
+            'vram_used': read_int_fd(self.vram_used_fd) / 1048576.0,  # Bytes to MiB, as nvidia-smi reports
+            'vram_total': self.vram_total,
+            'core_clock': self.read_clock(self.sclk_fd),
+            'mem_clock': self.read_clock(self.mclk_fd),
+        }
+
+    def read_clock(self, fd):
+        """pread a DPM table and return its active clock in MHz."""
+        return parse_dpm_clock(read_fd(fd, 1024).decode()) if fd is not None else 0
+
+
+class IntelGpuBackend(SysfsGpuBackend):
+    """Intel GPUs through the i915/xe sysfs attributes.
+
+    Neither driver exports a utilization counter in sysfs, so the load is
+    derived from how much of the elapsed time the GT spent in RC6 (idle).
+    """
+
+    name = 'intel'
+
+    # Candidate paths, relative to the card directory, for i915 and xe
+    FREQ_PATHS = ['gt_act_freq_mhz', 'gt/gt0/rps_act_freq_mhz', 'device/tile0/gt0/freq0/act_freq']
+    IDLE_PATHS = ['gt/gt0/rc6_residency_ms', 'power/rc6_residency_ms',
+                  'device/tile0/gt0/gtidle/idle_residency_ms']
+
+    def open_first(self, candidates):
+        """Open the first candidate attribute that exists."""
+        for relative in candidates:
+            fd = self.open_attribute(self.card / relative)
+            if fd is not None:
+                return fd
+        return None
+
+    def open(self):
+        self.freq_fd = self.open_first(self.FREQ_PATHS)
+        self.idle_fd = self.open_first(self.IDLE_PATHS)
+        temp_path = find_hwmon_temp(self.device)  # Discrete GPUs only
+        self.temp_fd = self.open_attribute(temp_path) if temp_path else None
+        self.prev_idle = None
+
+    def sample(self):
+        load = 0.0
+        if self.idle_fd is not None:
+            now = time.monotonic()
+            idle = read_int_fd(self.idle_fd)
+            if self.prev_idle is not None and now > self.prev_idle[1]:
+                idle_ratio = (idle - self.prev_idle[0]) / ((now - self.prev_idle[1]) * 1000.0)
+                load = round(min(max(100.0 * (1.0 - idle_ratio), 0.0), 100.0))
+            self.prev_idle = (idle, now)
+
+        return {
+            'temp': read_int_fd(self.temp_fd) / 1000.0,  # Convert from millidegrees
+            'load': load,
+            'mem_util': 0.0,
+            'vram_used': 0.0,  # Not exported in sysfs
+            'vram_total': 0.0,
+            'core_clock': read_int_fd(self.freq_fd),
+            'mem_clock': 0,
+        }
+
+
+SYSFS_GPU_DRIVERS = {'amdgpu': AmdgpuBackend, 'i915': IntelGpuBackend, 'xe': IntelGpuBackend}
+
+
+def drm_cards(root=DRM_ROOT):
+    """Return (card directory, kernel driver name) for every DRM card."""
+    cards = []
+    for card in sorted(Path(root).glob('card*')):
+        if not DRM_CARD_NAME.match(card.name):
+            continue
+        try:
+            driver = os.path.basename(os.readlink(card / 'device/driver'))
+        except OSError:
+            continue
+        cards.append((card, driver))
+    return cards
+
+
+def detect_gpu_backend(preferred='auto', drm_root=DRM_ROOT, stream_interval=None):
+    """Pick the GPU backend once: nvidia-smi if installed, then amdgpu, then Intel."""
+    import shutil
+    if preferred == 'nvidia' or (preferred == 'auto' and shutil.which('nvidia-smi')):
+        return NvidiaSmiBackend(stream_interval)
+    if preferred == 'none':
+        return GpuBackend()
+
+    # Discrete AMD cards before (usually integrated) Intel ones
+    wanted = ['amdgpu', 'intel'] if preferred == 'auto' else [preferred]
+    cards = drm_cards(drm_root)
+    for name in wanted:
+        for card, driver in cards:
+            backend = SYSFS_GPU_DRIVERS.get(driver)
+            if backend is not None and backend.name == name:
+                return backend(card)
+    return GpuBackend()
+
+
+FRAME_WINDOW = 5.0  # Seconds of frame times behind the FPS and 1% low
+FPS_STALE_AFTER = 1.0  # Report 0 FPS once no frame arrived for this long (game closed)
+MANGOHUD_POLL_INTERVAL = 0.25  # The log is flushed in batches, no need to look more often
+MANGOHUD_IDLE_POLL_INTERVAL = 2.0  # Polling backs off up to this while no log is growing (no game running)
+MANGOHUD_HEADER_LINES = 5  # System info lines come before the column header
+
+
+class FrameTimeWindow:
+    """Sliding window of frame times in ms, with FPS and the 1% low recomputed per batch.
+
+    Readers only pick up the (fps, 1% low, time) tuple stored by the last
+    batch, so they never sort or walk the window themselves.
+    """
+
+    def __init__(self, window=FRAME_WINDOW, stale_after=FPS_STALE_AFTER):
+        self.window = window
+        self.stale_after = stale_after
+        self.frames = deque()  # (arrival time, frame time)
+        self.total = 0.0
+        self.stats = (0, 0, None)
+
+    def add(self, frametimes, now=None):
+        """Append a batch of frame times and recompute the stats."""
+        now = time.monotonic() if now is None else now
+        added = False
+        for frametime in frametimes:
+            if frametime > 0:
+                self.frames.append((now, frametime))
+                self.total += frametime
+                added = True
+        if not added:
+            return
+
+        oldest = now - self.window
+        while self.frames[0][0] < oldest:
+            self.total -= self.frames.popleft()[1]
+
+        # 1% low: the frame rate of the slowest 1% of frames
+        worst = nlargest(max(1, len(self.frames) // 100), [frametime for _, frametime in self.frames])
+        self.stats = (round(1000.0 * len(self.frames) / self.total), round(1000.0 * len(worst) / sum(worst)), now)
+
+    def latest(self, now=None):
+        """Return (fps, 1% low), or (0, 0) when the last frame is too old."""
+        fps, low, updated = self.stats
+        now = time.monotonic() if now is None else now
+        if updated is None or now - updated > self.stale_after:
+            return 0, 0
+        return fps, low
+
+
+def parse_frametimes(text):
+    """Parse whitespace separated frame times in ms, skipping anything that is not a number."""
+    frametimes = []
+    for token in text.split():
+        try:
+            frametimes.append(float(token))
+        except ValueError:
+            continue
+    return frametimes
+
+
+class FrameTimeSource:
+    """Background reader feeding a FrameTimeWindow; the tick only calls latest()."""
+
+    name = 'frametime'
+
+    def __init__(self, window=None):
+        self.window = window or FrameTimeWindow()
+        self.running = False
+        self.stop_event = threading.Event()  # Cuts a reader's wait short on stop()
+        self.thread = None
+
+    def start(self):
+        """Start the reader thread."""
+        if self.running:
+            return
+        self.running = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._reader, name=f'fps-{self.name}', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the reader thread; start() may be called again afterwards."""
+        self.running = False
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)  # Readers wake up on stop_event or at least every 0.5 s
+
+    def latest(self):
+        return self.window.latest()
+
+    def _reader(self):
+        pass
+
+
+class MangoHudLogSource(FrameTimeSource):
+    """Tail the newest MangoHud CSV log (output_folder) for its frametime column."""
+
+    name = 'mangohud'
+
+    def __init__(self, directory, window=None):
+        super().__init__(window)
+        self.directory = Path(directory).expanduser()
+        self.path = None
+        self.file = None
+        self.column = None  # Index of the frametime column, or -1 for the fps column
+        self.partial = ''
+
+    def newest_log(self):
+        """Return the most recently modified per-frame log, or None."""
+        try:
+            logs = [path for path in self.directory.glob('*.csv') if not path.name.endswith('_summary.csv')]
+            return max(logs, key=lambda path: path.stat().st_mtime) if logs else None
+        except OSError:
+            return None
+
+    def open_log(self, path):
+        """Open a log, find its column header and skip the rows already written."""
+        self.close_log()
+        try:
+            self.file = open(path, 'r')
+        except OSError:
+            return
+        self.path = path
+        self.column = None
+        self.partial = ''
+
+        # The header is written when the log starts; a running log is followed from its end
+        for _ in range(MANGOHUD_HEADER_LINES):
+            line = self.file.readline()
+            if not line.endswith('\n'):
+                self.partial = line  # Still being written
+                break
+            self.consume(line)
+            if self.column is not None:
+                break
+        header_end = self.file.tell()
+        if self.file.seek(0, os.SEEK_END) > header_end:
+            self.partial = None  # Possibly inside a row, skip to the next line
+
+    def close_log(self):
+        if self.file:
+            self.file.close()
+        self.file = None
+        self.path = None
+
+    def consume(self, text):
+        """Parse complete lines of new log text into frame times."""
+        if self.partial is None:
+            if '\n' not in text:
+                return
+            text = text[text.index('\n') + 1:]
+            self.partial = ''
+        lines = (self.partial + text).split('\n')
+        self.partial = lines.pop()  # Incomplete last line, finished by the next read
+        frametimes = []
+        for line in lines:
+            fields = line.strip().split(',')
+            if self.column is None:
+                if 'frametime' in fields:
+                    self.column = fields.index('frametime')
+                elif fields[0] == 'fps':
+                    self.column = -1
+                continue  # System info lines before the header
+            try:
+                if self.column >= 0:
+                    frametimes.append(float(fields[self.column]))
+                else:
+                    frametimes.append(1000.0 / float(fields[0]))
+            except (IndexError, ValueError, ZeroDivisionError):
+                continue
+        if frametimes:
+            self.window.add(frametimes)
+
+    def _reader(self):
+        """Follow the newest log, switching when a newer one appears.
+
+        The logs are only listed again when the directory mtime changes (a
+        log was created or removed), and polling backs off while the log
+        does not grow.
+        """
+        directory_mtime = None
+        delay = MANGOHUD_POLL_INTERVAL
+        while self.running:
+            try:
+                mtime = os.stat(self.directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != directory_mtime:
+                directory_mtime = mtime
+                newest = self.newest_log()
+                if newest is not None and newest != self.path:
+                    self.open_log(newest)
+            text = ''
+            if self.file:
+                try:
+                    text = self.file.read()
+                    self.consume(text)
+                except (OSError, ValueError):
+                    self.close_log()
+            delay = MANGOHUD_POLL_INTERVAL if text else min(delay * 2, MANGOHUD_IDLE_POLL_INTERVAL)
+            self.stop_event.wait(delay)
+        self.close_log()
+
+
+def remove_stale_socket(path, kind):
+    """Remove a socket of the given type left behind by a previous run.
+
+    A socket that still accepts a connect() belongs to a running instance
+    and is kept (binding then fails), as is any other kind of file at path.
+    """
+    import errno
+    import socket
+    import stat
+    try:
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            return
+    except OSError:
+        return
+    probe = socket.socket(socket.AF_UNIX, kind)
+    try:
+        probe.connect(path)
+    except OSError as e:
+        if e.errno == errno.ECONNREFUSED:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    finally:
+        probe.close()
+
+
+class UnixFrameTimeSource(FrameTimeSource):
+    """Receive frame times (ms, whitespace separated) as datagrams on a Unix socket."""
+
+    name = 'unix'
+
+    def __init__(self, path, window=None):
+        super().__init__(window)
+        self.path = path
+        self.sock = None
+
+    def start(self):
+        import socket
+
+        remove_stale_socket(self.path, socket.SOCK_DGRAM)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.settimeout(0.5)  # Wake up now and then to notice stop()
+        super().start()
+
+    def _reader(self):
+        while self.running:
+            try:
+                data = self.sock.recv(65536)
+            except OSError:
+                continue  # Timeout
+            self.window.add(parse_frametimes(data.decode(errors='replace')))
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+FPS_SOURCES = {'mangohud': MangoHudLogSource, 'unix': UnixFrameTimeSource}
+
+
+def parse_fps_source(spec):
+    """Split 'mangohud:DIR' or 'unix:PATH' into (kind, target)."""
+    kind, _, target = spec.partition(':')
+    if kind not in FPS_SOURCES or not target:
+        raise ValueError(f"invalid FPS source '{spec}' (expected mangohud:DIR or unix:PATH)")
+    return kind, target
+
+
+def create_fps_source(spec):
+    """Create a frame time source from its spec."""
+    kind, target = parse_fps_source(spec)
+    return FPS_SOURCES[kind](target)
+
+
+PROC_STAT_PATH = '/proc/stat'
+PROC_STAT_CPU_ROWS = re.compile(rb'(?:cpu[^\n]*\n)+')
+# user, nice, system, idle, iowait, irq, softirq, steal (guest time is already included in user/nice)
+PROC_STAT_TIME_FIELDS = 8
+PROC_STAT_IDLE_FIELDS = (3, 4)  # idle, iowait
+
+
+class ProcStatReader:
+    """Compute total and per-core CPU load from /proc/stat for any number of cores.
+
+    The file is read with a single pread into a reused buffer, every cpu row
+    is parsed into one flat array (rows x fields) and all deltas are done
+    column-wise with map() over whole arrays instead of per-core Python loops.
+    """
+
+    def __init__(self, path=PROC_STAT_PATH):
+        self.path = path
+        self.fd = None
+        self.buffer = bytearray(16384)
+        self.prev_total = array('q')
+        self.prev_idle = array('q')
+
+    def read_stat(self):
+        """Read the whole file into the reused buffer and return a view of it."""
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_RDONLY)
+        while True:
+            size = os.preadv(self.fd, [self.buffer], 0)
+            if size < len(self.buffer):
+                return memoryview(self.buffer)[:size]
+            self.buffer = bytearray(len(self.buffer) * 2)  # Huge host, grow once and keep it
+
+    def sample(self):
+        """Return the loads in percent since the previous sample: [total, cpu0, cpu1, ...]."""
+        match = PROC_STAT_CPU_ROWS.match(self.read_stat())
+        if not match:
+            return None
+        section = match.group(0)
+
+        tokens = section.split()
+        row_width = len(section[:section.index(b'\n')].split())
+        del tokens[::row_width]  # Drop the cpu/cpuN labels
+        stride = row_width - 1
+        matrix = array('q', map(int, tokens))
+
+        # Column-wise sums over all rows at once
+        columns = [matrix[i::stride] for i in range(min(stride, PROC_STAT_TIME_FIELDS))]
+        total = array('q', reduce(lambda a, b: map(add, a, b), columns))
+        idle = array('q', reduce(lambda a, b: map(add, a, b),
+                                 [columns[i] for i in PROC_STAT_IDLE_FIELDS if i < len(columns)]))
+
+        prev_total, prev_idle = self.prev_total, self.prev_idle
+        self.prev_total, self.prev_idle = total, idle
+        if len(prev_total) != len(total):
+            return None  # First sample or CPU hotplug, nothing to compare against
+
+        total_diff = array('q', map(sub, total, prev_total))
+        busy_diff = map(sub, total_diff, map(sub, idle, prev_idle))
+        return list(map(truediv, map(mul, busy_diff, repeat(100.0)), map(max, total_diff, repeat(1))))
+
+    def close(self):
+        """Close the /proc/stat descriptor."""
+        if self.fd is not None:
+            close_fds([self.fd])
+            self.fd = None
+
+
+DEFAULT_HISTORY_WINDOW = 60  # Seconds covered by the history aggregates
+SPARKLINE_BINS = 16  # One loadbar character per bin, drawn where the core bars are
+
+
+class MetricHistory:
+    """Fixed-size, array-backed ring buffer of one metric with incremental window aggregates.
+
+    The mean comes from a running sum, min and max from monotonic queues
+    (each bounded by the window size) and the sparkline from per-bin means
+    pushed into a second ring as each bin fills up, so no aggregate ever
+    re-scans the window and memory stays constant.
+    """
+
+    def __init__(self, size, bins=SPARKLINE_BINS):
+        self.size = max(size, bins)
+        self.values = array('d', bytes(8 * self.size))
+        self.head = 0
+        self.count = 0
+        self.seq = 0
+        self.total = 0.0
+        self.min_queue = deque()  # (seq, value), increasing values
+        self.max_queue = deque()  # (seq, value), decreasing values
+        self.bins = bins
+        self.bin_size = self.size // bins
+        self.bin_means = array('d', bytes(8 * bins))
+        self.bin_head = 0
+        self.bin_sum = 0.0
+        self.bin_fill = 0
+        self.lock = threading.Lock()
+
+    def add(self, value):
+        """Append one sample, evicting the oldest once the window is full."""
+        with self.lock:
+            if self.count == self.size:
+                self.total -= self.values[self.head]
+            else:
+                self.count += 1
+            self.values[self.head] = value
+            self.head = (self.head + 1) % self.size
+            self.total += value
+
+            seq = self.seq
+            self.seq += 1
+            while self.min_queue and self.min_queue[-1][1] >= value:
+                self.min_queue.pop()
+            self.min_queue.append((seq, value))
+            while self.max_queue and self.max_queue[-1][1] <= value:
+                self.max_queue.pop()
+            self.max_queue.append((seq, value))
+            oldest = seq - self.size
+            if self.min_queue[0][0] <= oldest:
+                self.min_queue.popleft()
+            if self.max_queue[0][0] <= oldest:
+                self.max_queue.popleft()
+
+            self.bin_sum += value
+            self.bin_fill += 1
+            if self.bin_fill == self.bin_size:
+                self.bin_means[self.bin_head] = self.bin_sum / self.bin_size
+                self.bin_head = (self.bin_head + 1) % self.bins
+                self.bin_sum = 0.0
+                self.bin_fill = 0
+
+    def min(self):
+        with self.lock:
+            return self.min_queue[0][1] if self.min_queue else 0
+
+    def max(self):
+        with self.lock:
+            return self.max_queue[0][1] if self.max_queue else 0
+
+    def mean(self):
+        with self.lock:
+            return self.total / self.count if self.count else 0
+
+    def sparkline(self):
+        """Return the completed bin means, oldest first."""
+        with self.lock:
+            return list(self.bin_means[self.bin_head:]) + list(self.bin_means[:self.bin_head])
+
+
+def pack_levels(values):
+    """Pack the loadbar levels (0-7) of 0-100 values into an int, 3 bits per value, first value lowest."""
+    packed = 0
+    for i, value in enumerate(values):
+        packed |= bar_level(value) << (3 * i)
+    return packed
+
+
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (seconds), rendered in Prometheus format."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Record one duration."""
+        with self.lock:
+            self.counts[bisect_left(self.buckets, seconds)] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def cumulative(self):
+        """Return ([(upper bound, cumulative count)], sum, count), the last bound being '+Inf'."""
+        with self.lock:
+            counts, total_sum, total_count = list(self.counts), self.sum, self.count
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets + ['+Inf'], counts):
+            running += count
+            result.append((bound, running))
+        return result, total_sum, total_count
+
+
+class HardwareMonitor:
+    def __init__(self, gpu_stream_interval=None, sysfs_root='/sys', procfs_root='/proc', gpu_backend='auto',
+                 fps_source=None):
         self.cpu_temps = [0] * 16
         self.cpu_loads = [0] * 16
         self.cpu_freqs = [0] * 8
@@ -29,20 +1118,57 @@ class HardwareMonitor:
         self.gpu_vram_percentage = 0
         self.cpu_package_temp = 0
         self.cpu_total_load = 0
-        self.fps = 0  # Placeholder - FPS monitoring is complex on Linux
+        self.fps = 0
+        self.fps_low = 0  # 1% low
         self.ghz_avg = 0.0
+        self.ghz_min = 0.0
+        self.ghz_max = 0.0
+        self.cpu_freqs_all = []  # GHz of every online core (cpu_freqs keeps the first 8)
+        self.cpu_freq_sampler = CpuFreqSampler(os.path.join(sysfs_root, 'devices/system/cpu'))
         
-        # Store previous CPU stats for load calculation
-        self.prev_cpu_stats = {}
-        
-        # For FPS, we might implement a simple frame counter later
+        # Loads of every core (cpu_loads only holds the first 16 for the display)
+        self.cpu_loads_all = []
+        self.proc_stat = ProcStatReader(os.path.join(procfs_root, 'stat'))
+
+        # Optional frame time source ('mangohud:DIR' or 'unix:PATH') read on its own thread
+        self.fps_source = create_fps_source(fps_source) if fps_source else None
+        if self.fps_source:
+            self.fps_source.start()
+
+        # History of the main values for the windowed aggregates and sparkline
+        self.configure_history(DEFAULT_HISTORY_WINDOW, DEFAULT_COLLECTOR_PERIODS['loads'])
+
+        # Duration of every collector run, whether sequential or scheduled
+        self.collector_latency = {name: LatencyHistogram() for name in self.collectors()}
+        self.paused = set()  # Collectors skipped by get_system_info (every display off)
+
+        # hwmon channels are discovered once and then re-read with pread
+        self.hwmon_temps = HwmonTemperatureReader(os.path.join(sysfs_root, 'class/hwmon'))
+        self.thermal_zones = ThermalZoneIndex(os.path.join(sysfs_root, 'class/thermal'))
+
+        # GPU backend detected once on first use (not at startup); sysfs backends then only pread,
+        # nvidia-smi may stream
+        self.gpu_backend_args = (gpu_backend, os.path.join(sysfs_root, 'class/drm'), gpu_stream_interval)
+        self.gpu_backend_lock = threading.Lock()
+        self._gpu_backend = None
+        self.background_paused = False  # Set by stop_background_sources(), also for a backend detected later
+        self.gpu_sample_age = None  # Seconds since the current GPU sample was taken
+
         self.running = True
 
+    def get_cpu_temperature_hwmon(self):
+        """Get CPU temperature from the cached /sys/class/hwmon channels."""
+        try:
+            return self.hwmon_temps.read()
+        except Exception:
+            return None
+
     def get_cpu_temperature_sensors(self):
         """Get CPU temperature using the 'sensors' command from lm-sensors."""
+        import subprocess
         try:
             # Run 'sensors' command to get hardware temperatures
-            result = subprocess.run(['sensors'], capture_output=True, text=True, check=True)
+            result = subprocess.run(['sensors'], capture_output=True, text=True, check=True, timeout=5)
             output = result.stdout
             
             # Prioritize specific sensors, especially Tctl for AMD CPUs
@@ -75,7 +1201,7 @@ class HardwareMonitor:
             if all_temps:
                 # Return the highest temperature found from remaining sensors
                 return max(all_temps)
-        except (subprocess.CalledProcessError, FileNotFoundError):
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
             # 'sensors' command not available or failed
             pass
         except Exception:
@@ -83,227 +1209,1314 @@ class HardwareMonitor:
         
         return None
 
-    def get_cpu_temperature_thermal_zones(self):
-        """Get CPU temperature from thermal zones in /sys/class/thermal/."""
-        try:
-            cpu_temp = 0
-            for i in range(20):  # Check first 20 thermal zones
-                temp_path = f"/sys/class/thermal/thermal_zone{i}/temp"
-                type_path = f"/sys/class/thermal/thermal_zone{i}/type"
-                
-                if Path(temp_path).exists() and Path(type_path).exists():
-                    with open(type_path, 'r') as f:
-                        type_name = f.read().strip()
-                    
-                    # Check for CPU-related thermal zones
-                    if any(keyword in type_name.lower() for keyword in ['cpu', 'package', 'core']):
-                        with open(temp_path, 'r') as f:
-                            temp = int(f.read().strip()) / 1000.0  # Convert from millidegrees
-                            cpu_temp = max(cpu_temp, temp)
-            
-            return cpu_temp if cpu_temp > 0 else None
-        except Exception:
-            return None
+    def get_cpu_temperature_thermal_zones(self):
+        """Get CPU temperature from the cached index of thermal zones in /sys/class/thermal/."""
+        try:
+            return self.thermal_zones.read()
+        except Exception:
+            return None
+
+    def invalidate_temperature_sources(self):
+        """Force the hwmon channels and thermal zones to be rediscovered on the next read."""
+        self.hwmon_temps.close()
+        self.thermal_zones.invalidate()
+
+    def get_cpu_temperature(self):
+        """Get CPU temperature using multiple methods."""
+        # Try hwmon first (no process spawn per tick)
+        temp = self.get_cpu_temperature_hwmon()
+        if temp is not None and temp > 0:
+            return temp
+
+        # Fallback to the sensors command
+        temp = self.get_cpu_temperature_sensors()
+        if temp is not None and temp > 0:
+            return temp
+        
+        # Fallback to thermal zones
+        temp = self.get_cpu_temperature_thermal_zones()
+        if temp is not None and temp > 0:
+            return temp
+        
+        # If all methods fail, return 0
+        return 0
+
+    def get_cpu_info(self):
+        """Get CPU information including temperatures, loads, and frequencies."""
+        self.update_cpu_temperature()
+        self.get_cpu_frequencies()
+
+    def update_cpu_temperature(self):
+        """Store the current CPU package temperature."""
+        self.cpu_package_temp = self.get_cpu_temperature()
+
+    def get_cpu_frequencies(self):
+        """Get CPU core frequencies and their average."""
+        try:
+            freqs = self.cpu_freq_sampler.sample()
+        except (OSError, ValueError):
+            # CPU went away between the hotplug check and the read, rediscover next time
+            self.cpu_freq_sampler.close()
+            return
+
+        self.cpu_freqs_all = freqs
+        self.cpu_freqs = (freqs + [0] * 8)[:8]  # Keep as float to preserve decimal values
+
+        # Calculate average, minimum and maximum GHz over all cores
+        active_freqs = [f for f in freqs if f > 0]
+        if active_freqs:
+            self.ghz_avg = round(sum(active_freqs) / len(active_freqs), 1)
+            self.ghz_min = min(active_freqs)
+            self.ghz_max = max(active_freqs)
+
+    def get_cpu_loads(self):
+        """Get CPU loads for individual cores and total CPU."""
+        try:
+            loads = self.proc_stat.sample()
+            if loads is None:
+                return
+
+            loads = list(map(round, loads))
+            self.cpu_total_load = loads[0]
+            self.cpu_loads_all = loads[1:]
+            # The display has 16 bars: cpu0 to cpu15 (or available cores)
+            self.cpu_loads = (self.cpu_loads_all + [0] * 16)[:16]
+        except Exception:
+            # If we can't get detailed CPU loads, keep existing values
+            self.proc_stat.close()
+
+    def apply_gpu_sample(self, sample):
+        """Store a GPU sample (see parse_nvidia_smi_line)."""
+        self.gpu_temp = sample['temp']
+        self.gpu_load = sample['load']
+        self.gpu_vram_used = sample['vram_used']
+        self.gpu_vram_total = sample['vram_total']
+        self.gpu_core_clock = sample['core_clock']
+        self.gpu_mem_clock = sample['mem_clock']
+
+        # Calculate VRAM percentage
+        if self.gpu_vram_total > 0:
+            self.gpu_vram_percentage = int((self.gpu_vram_used * 100) / self.gpu_vram_total)
+
+    @property
+    def gpu_backend(self):
+        """The GPU backend, detected by the first collector (or metrics scrape) that needs it."""
+        with self.gpu_backend_lock:
+            if self._gpu_backend is None:
+                preferred, drm_root, stream_interval = self.gpu_backend_args
+                self._gpu_backend = detect_gpu_backend(preferred, drm_root, stream_interval=stream_interval)
+                if self.background_paused:
+                    self._gpu_backend.pause()
+            return self._gpu_backend
+
+    def detected_gpu_backend(self):
+        """Return the GPU backend if something already needed it, without detecting it."""
+        return self._gpu_backend
+
+    def get_gpu_info(self):
+        """Get GPU information from the backend detected on first use."""
+        try:
+            sample = self.gpu_backend.read()
+            if sample is not None:
+                self.apply_gpu_sample(sample)
+            self.gpu_sample_age = self.gpu_backend.sample_age
+        except Exception:
+            # GPU info will keep its last values
+            pass
+
+    def apply_snapshot(self, snapshot):
+        """Load the live values of a (recorded) snapshot, e.g. to replay it through get_formatted_data."""
+        self.cpu_loads = list(snapshot['cpu_loads'])
+        self.fps = snapshot['fps']
+        self.cpu_package_temp = snapshot['cpu_temp']
+        self.gpu_temp = snapshot['gpu_temp']
+        self.cpu_total_load = snapshot['cpu_load']
+        self.ghz_avg = snapshot['ghz_avg']
+        self.gpu_core_clock = snapshot['gpu_core_clock']
+        self.gpu_mem_clock = snapshot['gpu_mem_clock']
+        self.gpu_load = snapshot['gpu_load']
+        self.gpu_vram_percentage = snapshot['gpu_vram_percentage']
+
+    def stop_background_sources(self):
+        """Stop the nvidia-smi stream and the frame time reader (every display off)."""
+        with self.gpu_backend_lock:
+            self.background_paused = True
+            if self._gpu_backend is not None:
+                self._gpu_backend.pause()
+        if self.fps_source:
+            self.fps_source.stop()
+
+    def start_background_sources(self):
+        """Restart what stop_background_sources() stopped."""
+        with self.gpu_backend_lock:
+            self.background_paused = False
+            if self._gpu_backend is not None:
+                self._gpu_backend.resume()
+        if self.fps_source:
+            self.fps_source.start()
+
+    def get_fps(self):
+        """Get FPS and 1% low from the frame time source (0 when no game is running)."""
+        if self.fps_source:
+            self.fps, self.fps_low = self.fps_source.latest()
+
+    def close(self):
+        """Release open descriptors and stop background readers."""
+        self.invalidate_temperature_sources()
+        self.proc_stat.close()
+        self.cpu_freq_sampler.close()
+        if self._gpu_backend is not None:
+            self._gpu_backend.close()
+        if self.fps_source:
+            self.fps_source.stop()
+
+    def get_system_info(self, names=None):
+        """Get overall system information, from all collectors or only the named ones."""
+        for name, collect in self.collectors().items():
+            if name in self.paused or (names is not None and name not in names):
+                continue
+            started = time.monotonic()
+            collect()
+            self.collector_latency[name].observe(time.monotonic() - started)
+
+    def configure_history(self, window, sample_period):
+        """(Re)create the history ring buffers for a window in seconds sampled every sample_period ms."""
+        size = max(SPARKLINE_BINS, int(window * 1000 // sample_period))
+        self.history = {name: MetricHistory(size) for name in ['cpu_load', 'cpu_temp', 'gpu_load', 'gpu_temp']}
+
+    def record_history(self):
+        """Append the current values to the history ring buffers."""
+        self.history['cpu_load'].add(self.cpu_total_load)
+        self.history['cpu_temp'].add(self.cpu_package_temp)
+        self.history['gpu_load'].add(self.gpu_load)
+        self.history['gpu_temp'].add(self.gpu_temp)
+
+    def sample_loads(self):
+        """Sample the CPU loads (one pread of /proc/stat) and append the current values to the history."""
+        self.get_cpu_loads()
+        self.record_history()
+
+    def collectors(self):
+        """Return the individual sampling functions, keyed by collector name."""
+        collectors = {
+            'loads': self.sample_loads,
+            'temps': self.update_cpu_temperature,
+            'freqs': self.get_cpu_frequencies,
+            'gpu': self.get_gpu_info,
+            'fps': self.get_fps,
+        }
+        if not self.fps_source:
+            del collectors['fps']  # Nothing to read, don't wake up for it
+        return collectors
+
+    def snapshot(self):
+        """Return a copy of the latest collected values."""
+        return {
+            'cpu_loads': list(self.cpu_loads),
+            'fps': self.fps,
+            'cpu_temp': self.cpu_package_temp,
+            'gpu_temp': self.gpu_temp,
+            'cpu_load': self.cpu_total_load,
+            'ghz_avg': self.ghz_avg,
+            'gpu_core_clock': self.gpu_core_clock,
+            'gpu_mem_clock': self.gpu_mem_clock,
+            'gpu_load': self.gpu_load,
+            'gpu_vram_percentage': self.gpu_vram_percentage,
+            'cpu_load_min': self.history['cpu_load'].min(),
+            'cpu_load_max': self.history['cpu_load'].max(),
+            'cpu_load_mean': self.history['cpu_load'].mean(),
+            'cpu_temp_max': self.history['cpu_temp'].max(),
+            'gpu_load_max': self.history['gpu_load'].max(),
+            'cpu_load_spark': pack_levels(self.history['cpu_load'].sparkline()),
+        }
+
+    def get_formatted_data(self):
+        """Format data in the same way as the C# application."""
+        # Format data in the same way as the C# application
+        # Format: cpuload0a+cpuload1b+...+cpuload15q+fps1r+tempCPUs+tempGPUt+cpuLoadu+ghzAvgv+gpuClkw+memClkx+gpuLoady+vram%z
+        data = (
+            f"{self.cpu_loads[0]}a{self.cpu_loads[1]}b{self.cpu_loads[2]}c{self.cpu_loads[3]}d"
+            f"{self.cpu_loads[4]}e{self.cpu_loads[5]}f{self.cpu_loads[6]}g{self.cpu_loads[7]}h"
+            f"{self.cpu_loads[8]}k{self.cpu_loads[9]}j{self.cpu_loads[10]}l{self.cpu_loads[11]}m"
+            f"{self.cpu_loads[12]}n{self.cpu_loads[13]}o{self.cpu_loads[14]}p{self.cpu_loads[15]}q"
+            f"{self.fps}r{self.cpu_package_temp:.0f}s{self.gpu_temp:.0f}t{self.cpu_total_load}u"
+            f"{self.ghz_avg:.1f}v{self.gpu_core_clock}w{self.gpu_mem_clock}x{self.gpu_load:.0f}y{self.gpu_vram_percentage}z"
+        )
+        return data
+
+
+# Default sampling period and timeout of each collector, in milliseconds
+DEFAULT_COLLECTOR_PERIODS = {
+    'loads': 250,  # Also the sampling rate of the history
+    'temps': 1000,
+    'freqs': 500,
+    'gpu': 500,
+    'fps': 250,
+}
+# Sampled in the background at a fixed period in every mode, so spikes between ticks reach the history;
+# they only pread, so they run inline on the scheduler thread
+FIXED_RATE_COLLECTORS = ['loads']
+MIN_COLLECTOR_TIMEOUT = 1000
+
+# Adaptive periods: grow while readings stay within a band around the last change, snap back on a change
+ADAPTIVE_BACKOFF = 1.5  # Period growth per run that saw no change
+ADAPTIVE_MAX_FACTOR = 8  # Default maximum period, relative to the configured one
+# Monitor attributes watched by each adaptive collector, and their band (FIXED_RATE_COLLECTORS have none)
+ADAPTIVE_BANDS = {
+    'temps': (['cpu_package_temp'], 1),
+    'freqs': (['ghz_avg'], 0.2),
+    'gpu': (['gpu_load', 'gpu_temp'], 3),
+    'fps': (['fps'], 2),
+}
+ADAPTIVE_TICK_BAND = (['cpu_total_load', 'cpu_package_temp', 'gpu_load', 'gpu_temp', 'fps'], 2)
+# Collectors stopped while every display reports its backlight off (nothing, not even the history, is shown)
+DISPLAY_OFF_PAUSED = ['loads', 'temps', 'gpu', 'fps']
+
+
+class AdaptiveRate:
+    """A period between min and max that backs off while readings stay inside a band."""
+
+    def __init__(self, min_period, max_period, band, backoff=ADAPTIVE_BACKOFF):
+        self.min_period = min_period
+        self.max_period = max(max_period, min_period)
+        self.band = band
+        self.backoff = backoff
+        self.period = min_period
+        self.reference = None  # Readings at the last change
+
+    def update(self, readings):
+        """Feed the latest readings and return the period to use next."""
+        if self.reference is None or any(abs(value - reference) > self.band
+                                         for value, reference in zip(readings, self.reference)):
+            self.reference = readings
+            self.period = self.min_period
+        else:
+            self.period = min(self.period * self.backoff, self.max_period)
+        return self.period
+
+    def reset(self):
+        """Go back to the minimum period."""
+        self.reference = None
+        self.period = self.min_period
+
+
+def attribute_reader(obj, names):
+    """Return a function reading the named attributes of obj as a tuple."""
+    return lambda: tuple(getattr(obj, name) for name in names)
+
+
+class Collector:
+    """A sampling function run on its own period by the CollectorScheduler."""
+
+    def __init__(self, name, func, period, timeout=None, latency=None, rate=None, readings=None, inline=False):
+        self.name = name
+        self.func = func
+        # Run on the scheduler thread itself, for calls that cannot hang (a pread of an open descriptor)
+        self.inline = inline
+        self.latency = latency if latency is not None else LatencyHistogram()
+        self.period = period / 1000.0
+        # Optional AdaptiveRate (in seconds) fed with readings() after every successful run
+        self.rate = rate
+        self.readings = readings
+        self.paused = False
+        self.timeout = (timeout if timeout is not None else max(MIN_COLLECTOR_TIMEOUT, 4 * period)) / 1000.0
+        self.next_due = 0.0
+        self.wakeup = threading.Event()  # Set by the scheduler to make the worker run the collector once
+        self.started = None
+        self.busy = False
+        self.timed_out = False
+        self.last_success = None  # time.monotonic() of the last successful run
+        self.last_duration = None
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    def age(self):
+        """Seconds since the last successful run (None if it never succeeded)."""
+        if self.last_success is None:
+            return None
+        return time.monotonic() - self.last_success
+
+
+class CollectorScheduler:
+    """Run each collector on its own period on its own worker thread.
+
+    Collectors publish straight into the HardwareMonitor attributes, so
+    send_data can read the latest snapshot without waiting for any source.
+    A collector that exceeds its timeout is reported and simply not
+    rescheduled until its hung call returns; the others keep running.
+    Workers are daemon threads, so a hung call never delays exit. Inline
+    collectors run on the scheduler thread, saving the hand-off wakeup.
+    The scheduler sleeps until the next collector is due, or until woken.
+    """
+
+    def __init__(self, collectors):
+        self.collectors = collectors
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.wakeup = threading.Event()  # Set by stop(), and by a worker that finished after it was due again
+        self.generation = 0  # Workers of a previous start() exit instead of serving the new one
+
+    @classmethod
+    def for_monitor(cls, monitor, periods=None, timeouts=None, max_periods=None, names=None):
+        """Build a scheduler for all (or the named) collectors of a HardwareMonitor.
+
+        With max_periods (a dict, possibly empty) the collectors in
+        ADAPTIVE_BANDS get adaptive periods, by default up to
+        ADAPTIVE_MAX_FACTOR times their configured period.
+        """
+        periods = dict(DEFAULT_COLLECTOR_PERIODS, **(periods or {}))
+        timeouts = timeouts or {}
+        collectors = []
+        for name, func in monitor.collectors().items():
+            if names is not None and name not in names:
+                continue
+            rate = readings = None
+            if max_periods is not None and name in ADAPTIVE_BANDS:
+                attributes, band = ADAPTIVE_BANDS[name]
+                max_period = max_periods.get(name, periods[name] * ADAPTIVE_MAX_FACTOR)
+                rate = AdaptiveRate(periods[name] / 1000.0, max_period / 1000.0, band)
+                readings = attribute_reader(monitor, attributes)
+            collectors.append(Collector(name, func, periods[name], timeouts.get(name),
+                                        monitor.collector_latency[name], rate, readings,
+                                        inline=name in FIXED_RATE_COLLECTORS))
+        return cls(collectors)
+
+    def start(self):
+        """Start the scheduler thread and the collector workers."""
+        self.stop_event.clear()
+        self.generation += 1
+        # One worker per collector, so a hung source only ever blocks its own slot
+        for collector in self.collectors:
+            if collector.inline:
+                continue
+            collector.wakeup = threading.Event()  # Fresh, so a leftover worker can never take its wakeups
+            threading.Thread(target=self._worker, args=(collector, collector.wakeup, self.generation),
+                             name=f'collector-{collector.name}', daemon=True).start()
+        self.thread = threading.Thread(target=self._loop, name='collector-scheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop scheduling; running collectors are not waited for."""
+        self.stop_event.set()
+        self.wakeup.set()
+        for collector in self.collectors:
+            collector.wakeup.set()  # Idle workers exit, busy ones once their call returns
+        if self.thread:
+            self.thread.join(timeout=1)
+
+    def _worker(self, collector, wakeup, generation):
+        """Run the collector every time the scheduler wakes this worker up."""
+        while True:
+            wakeup.wait()
+            wakeup.clear()
+            if self.stop_event.is_set() or generation != self.generation:
+                return
+            self._run_collector(collector)
+
+    def _run_collector(self, collector):
+        """Run one collector call and record its outcome."""
+        try:
+            collector.func()
+            collector.last_success = time.monotonic()
+            if collector.rate:
+                collector.period = collector.rate.update(collector.readings())
+                collector.next_due = collector.started + collector.period
+        except Exception as e:
+            collector.failures += 1
+            print(f"Collector {collector.name} failed: {e}")
+        finally:
+            collector.last_duration = time.monotonic() - collector.started
+            collector.latency.observe(collector.last_duration)
+            collector.runs += 1
+            collector.busy = False
+            if time.monotonic() >= collector.next_due:
+                self.wakeup.set()  # The scheduler is waiting for a deadline, not for this run
+
+    def _loop(self):
+        """Submit due collectors and watch running ones for timeouts."""
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            wake = float('inf')  # Nothing due: sleep until resume(), stop() or a worker wakes the loop
+            for collector in self.collectors:
+                if collector.busy:
+                    deadline = collector.started + collector.timeout
+                    if now >= deadline:
+                        if not collector.timed_out:
+                            collector.timed_out = True
+                            collector.timeouts += 1
+                            print(f"Collector {collector.name} timed out after {collector.timeout:.1f}s")
+                    else:
+                        wake = min(wake, deadline)
+                    if collector.next_due > now:
+                        wake = min(wake, collector.next_due)  # Likely done by then
+                    continue
+
+                collector.timed_out = False
+                if collector.paused:
+                    continue
+                if now >= collector.next_due:
+                    collector.busy = True
+                    collector.started = now
+                    # Keep the cadence, but never queue up missed runs (nor run twice after start or resume)
+                    collector.next_due += collector.period
+                    if collector.next_due <= now:
+                        collector.next_due = now + collector.period
+                    if collector.inline:
+                        self._run_collector(collector)
+                    else:
+                        collector.wakeup.set()
+                wake = min(wake, collector.next_due)
+            self.wakeup.wait(max(0.0, wake - time.monotonic()) if wake != float('inf') else None)
+            self.wakeup.clear()
+
+    def pause(self, names):
+        """Stop running the named collectors until resume()."""
+        for collector in self.collectors:
+            if collector.name in names:
+                collector.paused = True
+
+    def resume(self, names):
+        """Run the named collectors again, right away and at their minimum period."""
+        for collector in self.collectors:
+            if collector.name in names and collector.paused:
+                collector.paused = False
+                collector.next_due = 0.0
+                if collector.rate:
+                    collector.rate.reset()
+                    collector.period = collector.rate.period
+        self.wakeup.set()  # The loop may be sleeping with nothing due
+
+    def period_of(self, name):
+        """Return the period of a collector in milliseconds."""
+        for collector in self.collectors:
+            if collector.name == name:
+                return collector.period * 1000
+        return None
+
+    def status(self):
+        """Return per-collector health, keyed by collector name."""
+        return {
+            c.name: {
+                'period': c.period,
+                'age': c.age(),
+                'last_duration': c.last_duration,
+                'runs': c.runs,
+                'failures': c.failures,
+                'timeouts': c.timeouts,
+                'stalled': c.timed_out,
+                'paused': c.paused,
+            }
+            for c in self.collectors
+        }
+
+
+# Binary serial protocol:
+#   start byte, version, flags, field bitmap (uint32 LE), present fields (fixed width, LE), CRC-8
+# Only fields that changed since the previous frame are sent, plus a full keyframe every N frames.
+BINARY_START = 0xA5
+BINARY_VERSION = 2  # Newest version; version 1 sketches only know the live page fields
+BINARY_FLAG_KEYFRAME = 0x01
+BINARY_FLAG_HISTORY_PAGE = 0x02  # Version 2: show the history page instead of the live values
+BINARY_HEADER = struct.Struct('<BBBI')
+# (snapshot key, list index, size in bytes, scale) in bitmap bit order
+BINARY_FIELDS = [('cpu_loads', i, 1, 1) for i in range(16)] + [
+    ('fps', None, 2, 1),
+    ('cpu_temp', None, 1, 1),
+    ('gpu_temp', None, 1, 1),
+    ('cpu_load', None, 1, 1),
+    ('ghz_avg', None, 1, 10),  # Tenths of GHz
+    ('gpu_core_clock', None, 2, 1),
+    ('gpu_mem_clock', None, 2, 1),
+    ('gpu_load', None, 1, 1),
+    ('gpu_vram_percentage', None, 1, 1),
+    # Version 2: history page
+    ('cpu_load_min', None, 1, 1),
+    ('cpu_load_max', None, 1, 1),
+    ('cpu_load_mean', None, 1, 1),
+    ('cpu_temp_max', None, 1, 1),
+    ('gpu_load_max', None, 1, 1),
+    ('cpu_load_spark', None, 6, 1),  # 16 loadbar levels of 3 bits each
+]
+BINARY_FIELD_MAX = [(1 << (8 * size)) - 1 for _, _, size, _ in BINARY_FIELDS]
+BINARY_VERSION_FIELDS = {1: 25, 2: len(BINARY_FIELDS)}  # Number of fields known to each version
+BINARY_LIVE_FIELDS = range(0, 25)
+BINARY_HISTORY_FIELDS = range(25, len(BINARY_FIELDS))
+DEFAULT_KEYFRAME_INTERVAL = 10
+
+# Negotiation: a legacy sketch just draws an empty VRAM bar for the hello,
+# a binary-capable one answers "HWB<version>\n" instead.
+BINARY_HELLO = b'HWBz'
+BINARY_HELLO_REPLY = b'HWB'
+BINARY_RESYNC = b'K'  # Sent by the sketch after a CRC error, next frame must be a keyframe
+DISPLAY_OFF = b'D0'  # Sent by the sketch when its backlight is switched off (and with the hello reply)
+DISPLAY_ON = b'D1'
+NEGOTIATE_TIMEOUT = 2.5  # Covers the bootloader reset when the port is opened
+NEGOTIATE_RETRY = 0.5
+
+
+def _make_crc8_table(poly=0x07):
+    """Build the lookup table for CRC-8 (polynomial x^8 + x^2 + x + 1)."""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+CRC8_TABLE = _make_crc8_table()
+
+
+def crc8(data):
+    """CRC-8 of data, matching crc8() in arduino_sketch.ino."""
+    crc = 0
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def binary_field_values(snapshot, count=len(BINARY_FIELDS)):
+    """Convert a HardwareMonitor snapshot into the integer values of the first count BINARY_FIELDS."""
+    values = []
+    for (key, index, _, scale), maximum in zip(BINARY_FIELDS[:count], BINARY_FIELD_MAX):
+        value = snapshot[key] if index is None else snapshot[key][index]
+        values.append(min(max(int(round(value * scale)), 0), maximum))
+    return values
+
+
+class BinaryFrameEncoder:
+    """Encode snapshots into delta-encoded binary frames.
+
+    encode() runs on the tick thread, while set_version() and
+    request_keyframe() are called from the writer thread; those only
+    change the version and a request counter, which encode() reads once
+    per frame, so the delta state itself is never touched concurrently.
+    """
+
+    def __init__(self, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL, version=BINARY_VERSION):
+        self.keyframe_interval = keyframe_interval
+        self.version = version
+        self.keyframe_requests = 0  # Only incremented by request_keyframe()
+        self.last_values = None
+        self.last_version = None
+        self.keyframes_served = 0  # keyframe_requests as of the last frame
+        self.frames_since_keyframe = 0
+        self.history_page = False
+        self.previous_state = None  # State before the last encode(), for discard_last()
+
+    def set_version(self, version):
+        """Encode for the given protocol version from the next (key)frame on."""
+        self.version = min(version, BINARY_VERSION)
+        self.request_keyframe()
+
+    def request_keyframe(self):
+        """Make the next frame a full keyframe (after connect or a CRC error on the device)."""
+        self.keyframe_requests += 1
+
+    def encode(self, snapshot, history_page=False):
+        """Return the frame bytes for a snapshot, for the live or (version 2+) history page."""
+        version = self.version
+        requests = self.keyframe_requests
+        self.previous_state = (self.last_values, self.last_version, self.keyframes_served,
+                               self.frames_since_keyframe, self.history_page)
+        history_page = history_page and version >= 2
+
+        values = binary_field_values(snapshot, BINARY_VERSION_FIELDS[version])
+        keyframe = (self.last_values is None or version != self.last_version or requests != self.keyframes_served
+                    or history_page != self.history_page  # The sketch redraws the whole page layout
+                    or self.frames_since_keyframe >= self.keyframe_interval - 1)
+
+        # Only the fields drawn on the current page are sent
+        bitmap = 0
+        payload = bytearray()
+        for bit in (BINARY_HISTORY_FIELDS if history_page else BINARY_LIVE_FIELDS):
+            value = values[bit]
+            if keyframe or value != self.last_values[bit]:
+                bitmap |= 1 << bit
+                payload += value.to_bytes(BINARY_FIELDS[bit][2], 'little')
+
+        self.last_values = values
+        self.last_version = version
+        self.keyframes_served = requests
+        self.history_page = history_page
+        self.frames_since_keyframe = 0 if keyframe else self.frames_since_keyframe + 1
+
+        flags = (BINARY_FLAG_KEYFRAME if keyframe else 0) | (BINARY_FLAG_HISTORY_PAGE if history_page else 0)
+        frame = bytearray(BINARY_HEADER.pack(BINARY_START, version, flags, bitmap))
+        frame += payload
+        frame.append(crc8(memoryview(frame)[1:]))
+        return bytes(frame)
+
+    def discard_last(self):
+        """Forget the last frame (dropped before it was written), so the next one also carries its changes."""
+        if self.previous_state is not None:
+            (self.last_values, self.last_version, self.keyframes_served,
+             self.frames_since_keyframe, self.history_page) = self.previous_state
+
+
+# Changes within these deadbands are not considered visible on the LCD
+DEFAULT_DEADBANDS = {
+    'fps': 1,
+    'cpu_temp': 1,
+    'gpu_temp': 1,
+    'cpu_load': 1,
+    'ghz_avg': 0.05,  # Any change of the displayed tenth
+    'gpu_core_clock': 15,
+    'gpu_mem_clock': 15,
+    'gpu_load': 1,
+    'cpu_load_min': 1,
+    'cpu_load_max': 1,
+    'cpu_load_mean': 1,
+    'cpu_temp_max': 1,
+    'gpu_load_max': 1,
+}
+# Fields drawn as loadbar characters only change when their bar level does
+BAR_FIELDS = ['cpu_loads', 'gpu_vram_percentage']
+EXACT_FIELDS = ['cpu_load_spark']  # Already quantized to loadbar levels
+BAR_THRESHOLDS = [14, 28, 42, 57, 71, 85]
+DEFAULT_HEARTBEAT = 2000
+DEFAULT_COALESCE = 200
+
+
+def bar_level(value):
+    """Return the loadbar character (0-7) the sketch draws for a 0-100 value."""
+    if value <= 0:
+        return 0
+    for level, threshold in enumerate(BAR_THRESHOLDS, start=1):
+        if value < threshold:
+            return level
+    return 7
+
+
+class ChangeDetector:
+    """Decide whether a snapshot differs visibly from the last one sent.
+
+    A frame is sent when a field moved outside its deadband (or a loadbar
+    changed level) or when the heartbeat expired. Frames are never sent
+    closer together than the coalesce interval; a change seen inside it is
+    kept pending (it still differs from the last sent snapshot) and goes
+    out with the next allowed frame, merging bursts into one write.
+    """
+
+    def __init__(self, deadbands=None, heartbeat=DEFAULT_HEARTBEAT, coalesce=DEFAULT_COALESCE):
+        self.deadbands = dict(DEFAULT_DEADBANDS, **(deadbands or {}))
+        self.heartbeat = heartbeat / 1000.0
+        self.coalesce = coalesce / 1000.0
+        self.last_sent = None
+        self.last_sent_time = None
+        self.sent = 0
+        self.suppressed = 0
+
+    def visible_change(self, snapshot):
+        """Return True if the snapshot would change what the LCD shows."""
+        for key, deadband in self.deadbands.items():
+            if abs(snapshot[key] - self.last_sent[key]) > deadband:
+                return True
+        for key in BAR_FIELDS:
+            new, old = snapshot[key], self.last_sent[key]
+            if isinstance(new, list):
+                if list(map(bar_level, new)) != list(map(bar_level, old)):
+                    return True
+            elif bar_level(new) != bar_level(old):
+                return True
+        return any(snapshot[key] != self.last_sent[key] for key in EXACT_FIELDS)
+
+    def should_send(self, snapshot, now=None):
+        """Return True if a frame should be written for this snapshot."""
+        now = time.monotonic() if now is None else now
+        if self.last_sent is None or now - self.last_sent_time >= self.heartbeat:
+            return True
+        if now - self.last_sent_time >= self.coalesce and self.visible_change(snapshot):
+            return True
+        self.suppressed += 1
+        return False
+
+    def reset(self):
+        """Forget the last sent snapshot, so the next one is sent (e.g. after a reconnect)."""
+        self.last_sent = None
+
+    def mark_sent(self, snapshot, now=None):
+        """Remember the snapshot that was just written."""
+        self.last_sent = snapshot
+        self.last_sent_time = time.monotonic() if now is None else now
+        self.sent += 1
+
+
+WRITE_TIMEOUT = 1.0
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+
+class LatestValueQueue:
+    """Single-slot queue: put() replaces any value not yet taken, so stale frames are dropped."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.value = None
+        self.dropped = 0
+
+    def put(self, value):
+        """Store a value, dropping the previous one if it was never taken."""
+        with self.condition:
+            if self.value is not None:
+                self.dropped += 1
+            self.value = value
+            self.condition.notify_all()
+
+    def pending(self):
+        """Return True if a value is waiting to be taken (and would be dropped by the next put)."""
+        with self.condition:
+            return self.value is not None
+
+    def get(self, timeout=None):
+        """Take the newest value, waiting up to timeout seconds (None if nothing arrived)."""
+        with self.condition:
+            if self.value is None:
+                self.condition.wait(timeout)
+            value, self.value = self.value, None
+            self.condition.notify_all()
+            return value
+
+    def wait_taken(self, timeout=None):
+        """Wait until the stored value was taken, for producers that must not drop (replay)."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.value is None, timeout)
+
+
+class SerialWriter:
+    """Background thread that owns the serial connection and writes the newest frame.
+
+    Sampling never blocks on the port: frames are handed over through a
+    LatestValueQueue, writes use write_timeout, and a lost connection is
+    re-established in the background with exponential backoff. Between
+    frames the thread blocks in select() on the port and a wake pipe, so
+    it only runs when a frame is submitted or the sketch sent something.
+    """
+
+    def __init__(self, owner):
+        # Provides connect(), close_port(), handle_device_messages(), message_timeout(), serial_port
+        # and on_first_frame
+        self.owner = owner
+        self.queue = LatestValueQueue()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_read, False)
+        os.set_blocking(self.wake_write, False)
+        self.connected = False
+        self.bytes_written = 0
+        self.frames_written = 0
+        self.write_errors = 0
+        self.reconnects = 0
+        self.last_write_duration = None
+        self.write_latency = LatencyHistogram()
+        self.rate_mark = (time.monotonic(), 0, 0)
+
+    @property
+    def frames_dropped(self):
+        return self.queue.dropped
+
+    def start(self):
+        """Start the writer thread; it connects in the background."""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='serial-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the writer thread."""
+        self.stop_event.set()
+        self.wake()
+        if self.thread:
+            self.thread.join(timeout=WRITE_TIMEOUT + 1)
+
+    def submit(self, frame):
+        """Hand a frame to the writer without blocking."""
+        self.queue.put(frame)
+        self.wake()
+
+    def wake(self):
+        """End the writer's select() (a full pipe already will)."""
+        try:
+            os.write(self.wake_write, b'\0')
+        except BlockingIOError:
+            pass
+
+    def wait(self, timeout):
+        """Block until a frame is submitted, the sketch sent data or timeout; returns whether the port is readable."""
+        import select
+
+        fds = [self.wake_read]
+        if hasattr(self.owner.serial_port, 'fileno'):  # Not a null sink
+            fds.append(self.owner.serial_port.fileno())
+        readable, _, _ = select.select(fds, [], [], timeout)
+        if self.wake_read in readable:
+            try:
+                os.read(self.wake_read, 4096)
+            except BlockingIOError:
+                pass
+        return len(fds) > 1 and fds[1] in readable
+
+    def _loop(self):
+        """Connect, write frames and reconnect with backoff on errors."""
+        delay = RECONNECT_MIN_DELAY
+        while not self.stop_event.is_set():
+            if not self.connected:
+                if self.owner.connect():
+                    self.connected = True
+                    delay = RECONNECT_MIN_DELAY
+                else:
+                    self.stop_event.wait(delay)
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                    continue
+
+            port_readable = False
+            if not self.queue.pending():
+                port_readable = self.wait(self.owner.message_timeout())
+            frame = self.queue.get(timeout=0)
+            if self.stop_event.is_set():
+                continue
+
+            try:
+                if frame is not None:
+                    started = time.monotonic()
+                    self.owner.serial_port.write(frame)
+                    self.last_write_duration = time.monotonic() - started
+                    self.write_latency.observe(self.last_write_duration)
+                    self.bytes_written += len(frame)
+                    self.frames_written += 1
+                    if self.frames_written == 1 and self.owner.on_first_frame:
+                        self.owner.on_first_frame(self.owner)
+                if port_readable and not self.owner.serial_port.in_waiting:
+                    # A hung up line stays readable, don't spin on it
+                    raise serial.SerialException("device reports readiness to read but returned no data")
+                # Also between (slow) frames, so a display switched back on is noticed right away
+                self.owner.handle_device_messages()
+            except Exception as e:
+                # SerialException (also SerialTimeoutException from write_timeout), or OSError (EIO) from
+                # the in_waiting ioctl after an unplug; either way the thread must live on to reconnect
+                print(f"Error sending data: {e}")
+                self.write_errors += 1
+                self.reconnects += 1
+                self.connected = False
+                self.owner.close_port()
+                print("Failed to send data, attempting to reconnect...")
+
+    def stats(self):
+        """Return counters plus frames and bytes per second since the previous call."""
+        now = time.monotonic()
+        mark_time, mark_bytes, mark_frames = self.rate_mark
+        elapsed = max(now - mark_time, 1e-9)
+        self.rate_mark = (now, self.bytes_written, self.frames_written)
+        return {
+            'connected': self.connected,
+            'bytes_written': self.bytes_written,
+            'frames_written': self.frames_written,
+            'frames_dropped': self.frames_dropped,
+            'write_errors': self.write_errors,
+            'reconnects': self.reconnects,
+            'bytes_per_second': (self.bytes_written - mark_bytes) / elapsed,
+            'frames_per_second': (self.frames_written - mark_frames) / elapsed,
+            'last_write_duration': self.last_write_duration,
+        }
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (fraction in 0..1)."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class TickScheduler:
+    """Hold a fixed cadence using time.monotonic() deadlines.
+
+    Deadlines advance by exactly one period, so time spent sampling and
+    writing does not add to the period. When the work overruns, the late
+    tick runs immediately and any ticks missed entirely are skipped
+    instead of being run back to back. The period may be changed between
+    ticks with set_period(), which can also cut the current wait short.
+    """
+
+    def __init__(self, interval, history=256):
+        self.period = interval / 1000.0
+        self.next_tick = None
+        self.last_tick = None
+        self.periods = deque(maxlen=history)  # (measured, intended) tick-to-tick periods
+        self.wakeup = threading.Event()
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+
+    def wait(self):
+        """Sleep until the next deadline."""
+        now = time.monotonic()
+        if self.next_tick is None:
+            self.next_tick = now
+        else:
+            self.next_tick += self.period
+            late = now - self.next_tick
+            if late > 0:
+                self.overruns += 1
+                missed = int(late // self.period)
+                if missed:
+                    self.skipped += missed
+                    self.next_tick += missed * self.period
+            elif self.wakeup.wait(-late):
+                # Woken early by set_period(), restart the cadence from here
+                self.next_tick = time.monotonic()
+            self.wakeup.clear()
+
+        now = time.monotonic()
+        if self.last_tick is not None:
+            self.periods.append((now - self.last_tick, self.period))
+        self.last_tick = now
+        self.ticks += 1
+
+    def set_period(self, interval, wake=False):
+        """Use a new period (ms) from the next tick on; wake=True ends the current wait now."""
+        self.period = interval / 1000.0
+        if wake:
+            self.wakeup.set()
+
+    def stats(self):
+        """Return the measured period, jitter percentiles (seconds) and overrun counters."""
+        periods = list(self.periods)
+        jitter = sorted(abs(measured - intended) for measured, intended in periods)
+        return {
+            'ticks': self.ticks,
+            'period': self.period,
+            'measured_period': sum(measured for measured, _ in periods) / len(periods) if periods else None,
+            'jitter_p50': percentile(jitter, 0.50),
+            'jitter_p95': percentile(jitter, 0.95),
+            'jitter_p99': percentile(jitter, 0.99),
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+        }
+
 
-    def get_cpu_temperature(self):
-        """Get CPU temperature using multiple methods."""
-        # Try sensors command first (more reliable)
-        temp = self.get_cpu_temperature_sensors()
-        if temp is not None and temp > 0:
-            return temp
-        
-        # Fallback to thermal zones
-        temp = self.get_cpu_temperature_thermal_zones()
-        if temp is not None and temp > 0:
-            return temp
-        
-        # If all methods fail, return 0
-        return 0
+PROTOCOLS = ['auto', 'legacy', 'binary']
+DEVICE_RESCAN_INTERVAL = 5.0  # Seconds between glob rescans for newly plugged displays
 
-    def get_cpu_info(self):
-        """Get CPU information including temperatures, loads, and frequencies."""
-        # Get CPU temperature
-        self.cpu_package_temp = self.get_cpu_temperature()
 
-        # Get CPU frequencies
-        try:
-            for i in range(8):  # Check up to 8 CPU cores for frequency
-                freq_path = f"/sys/devices/system/cpu/cpu{i}/cpufreq/scaling_cur_freq"
-                if Path(freq_path).exists():
-                    with open(freq_path, 'r') as f:
-                        freq = int(f.read().strip()) / 1000000.0  # Convert to GHz
-                        if i < len(self.cpu_freqs):
-                            self.cpu_freqs[i] = freq  # Keep as float to preserve decimal values
-        except Exception:
-            pass
+def parse_port_spec(spec, baud_rate=9600, protocol='auto'):
+    """Split a 'PATH[:BAUD[:PROTOCOL]]' port spec, using the given defaults for missing parts."""
+    path, _, rest = spec.partition(':')
+    baud, _, proto = rest.partition(':')
+    if baud and not baud.isdigit():
+        raise ValueError(f"invalid baud rate '{baud}' in port '{spec}'")
+    if proto and proto not in PROTOCOLS:
+        raise ValueError(f"invalid protocol '{proto}' in port '{spec}'")
+    return path, int(baud) if baud else baud_rate, proto or protocol
 
-        # Calculate average GHz
-        active_freqs = [f for f in self.cpu_freqs if f > 0]
-        if active_freqs:
-            self.ghz_avg = round(sum(active_freqs) / len(active_freqs), 1)
 
-    def get_cpu_loads(self):
-        """Get CPU loads for individual cores and total CPU."""
-        try:
-            with open('/proc/stat', 'r') as f:
-                lines = f.readlines()
-            
-            cpu_lines = [line for line in lines if line.startswith('cpu') and line[3] != ' ']
-            
-            # Process total CPU line (first line)
-            if len(cpu_lines) > 0:
-                parts = cpu_lines[0].split()  # Total CPU line (cpu)
-                if len(parts) >= 5:
-                    cpu_name = parts[0]
-                    user = int(parts[1])
-                    nice = int(parts[2])
-                    system = int(parts[3])
-                    idle = int(parts[4])
-                    
-                    total = user + nice + system + idle
-                    total_idle = idle
-                    
-                    # Calculate total CPU load
-                    if cpu_name in self.prev_cpu_stats:
-                        prev_total, prev_idle = self.prev_cpu_stats[cpu_name]
-                        total_diff = total - prev_total
-                        idle_diff = total_idle - prev_idle
-                        
-                        if total_diff != 0:
-                            cpu_load = 100.0 * (total_diff - idle_diff) / total_diff
-                            self.cpu_total_load = round(cpu_load, 0)
-                    
-                    self.prev_cpu_stats[cpu_name] = (total, total_idle)
-            
-            # Process individual CPU cores (cpu0, cpu1, etc.)
-            for i, line in enumerate(cpu_lines[1:17]):  # cpu0 to cpu15 (or available cores)
-                if i < 16:
-                    parts = line.split()
-                    if len(parts) >= 5:
-                        cpu_name = parts[0]
-                        user = int(parts[1])
-                        nice = int(parts[2])
-                        system = int(parts[3])
-                        idle = int(parts[4])
-                        
-                        total = user + nice + system + idle
-                        total_idle = idle
-                        
-                        # Calculate individual core load
-                        if cpu_name in self.prev_cpu_stats:
-                            prev_total, prev_idle = self.prev_cpu_stats[cpu_name]
-                            total_diff = total - prev_total
-                            idle_diff = total_idle - prev_idle
-                            
-                            if total_diff != 0:
-                                core_load = 100.0 * (total_diff - idle_diff) / total_diff
-                                self.cpu_loads[i] = round(core_load, 0)
-                        
-                        self.prev_cpu_stats[cpu_name] = (total, total_idle)
-                        
-        except Exception as e:
-            # If we can't get detailed CPU loads, keep existing values
-            pass
+def is_port_glob(path):
+    """Return True if a port path contains glob wildcards."""
+    return any(char in path for char in '*?[')
 
-    def get_gpu_info(self):
-        """Get GPU information using nvidia-smi if available."""
-        try:
-            # Try to get NVIDIA GPU info
-            result = subprocess.run(['nvidia-smi', 
-                                   '--query-gpu=temperature.gpu,utilization.gpu,utilization.memory,memory.used,memory.total,clocks.gr,clocks.mem',
-                                   '--format=csv,noheader,nounits'], 
-                                  capture_output=True, text=True, timeout=5)
-            
-            if result.returncode == 0:
-                # Parse nvidia-smi output
-                output = result.stdout.strip()
-                if output:
-                    parts = output.split(', ')
-                    if len(parts) >= 7:
-                        self.gpu_temp = float(parts[0])  # Temperature
-                        self.gpu_load = float(parts[1])  # GPU utilization
-                        vram_percentage = float(parts[2])  # Memory utilization
-                        self.gpu_vram_used = float(parts[3])  # Memory used
-                        self.gpu_vram_total = float(parts[4])  # Memory total
-                        self.gpu_core_clock = int(float(parts[5]))  # Graphics clock (as integer)
-                        self.gpu_mem_clock = int(float(parts[6]))  # Memory clock (as integer)
-                        
-                        # Calculate VRAM percentage
-                        if self.gpu_vram_total > 0:
-                            self.gpu_vram_percentage = int((self.gpu_vram_used * 100) / self.gpu_vram_total)
-            else:
-                # If nvidia-smi is not available, try other methods
-                # For AMD GPUs, we could use rocm-smi or other tools
-                pass
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            # nvidia-smi not available, GPU info will remain at defaults
-            pass
-        except Exception:
-            pass
 
+# USB VID:PID of Arduino boards and the serial adapters of clones (None matches any PID of the vendor)
+ARDUINO_USB_IDS = [
+    (0x2341, None),    # Arduino
+    (0x2A03, None),    # Arduino.org
+    (0x1B4F, None),    # SparkFun
+    (0x1A86, 0x7523),  # CH340
+    (0x0403, 0x6001),  # FTDI FT232R
+    (0x10C4, 0xEA60),  # CP210x
+]
+DEVICE_CACHE_LOCK = threading.Lock()
 
-    def get_system_info(self):
-        """Get overall system information."""
-        self.get_cpu_info()
-        self.get_gpu_info()
-        self.get_cpu_loads()
 
-    def get_formatted_data(self):
-        """Format data in the same way as the C# application."""
-        # Format data in the same way as the C# application
-        # Format: cpuload0a+cpuload1b+...+cpuload15q+fps1r+tempCPUs+tempGPUt+cpuLoadu+ghzAvgv+gpuClkw+memClkx+gpuLoady+vram%z
-        data = (
-            f"{self.cpu_loads[0]}a{self.cpu_loads[1]}b{self.cpu_loads[2]}c{self.cpu_loads[3]}d"
-            f"{self.cpu_loads[4]}e{self.cpu_loads[5]}f{self.cpu_loads[6]}g{self.cpu_loads[7]}h"
-            f"{self.cpu_loads[8]}k{self.cpu_loads[9]}j{self.cpu_loads[10]}l{self.cpu_loads[11]}m"
-            f"{self.cpu_loads[12]}n{self.cpu_loads[13]}o{self.cpu_loads[14]}p{self.cpu_loads[15]}q"
-            f"{self.fps}r{self.cpu_package_temp:.0f}s{self.gpu_temp:.0f}t{self.cpu_total_load}u"
-            f"{self.ghz_avg:.1f}v{self.gpu_core_clock}w{self.gpu_mem_clock}x{self.gpu_load:.0f}y{self.gpu_vram_percentage}z"
-        )
-        return data
+def is_arduino_usb_id(vid, pid):
+    """Return True if a USB VID:PID belongs to an Arduino board or a usual clone adapter."""
+    return any(vid == known_vid and known_pid in (None, pid) for known_vid, known_pid in ARDUINO_USB_IDS)
 
 
-class ArduinoCommunicator:
-    def __init__(self, port_name=None, baud_rate=9600):
+def list_serial_ports():
+    """Return the serial ports with their USB ids (read from sysfs, nothing is opened)."""
+    try:
+        from serial.tools import list_ports
+        return sorted(list_ports.comports(), key=lambda port: port.device)
+    except Exception:
+        return []
+
+
+def device_cache_path():
+    """Return the file of the last-known-good devices, in $XDG_CACHE_HOME."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'arduino_hw_info', 'devices.json')
+
+
+def load_device_cache():
+    """Return the last-known-good devices keyed by port spec ('auto' for auto-detection)."""
+    import json
+    try:
+        with open(device_cache_path()) as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_device_cache(key, entry):
+    """Store the last-known-good device of a port spec, replacing the file atomically."""
+    import json
+    path = device_cache_path()
+    with DEVICE_CACHE_LOCK:
+        cache = load_device_cache()
+        if cache.get(key) == entry:
+            return
+        cache[key] = entry
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(cache, f, indent=1, sort_keys=True)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"Could not save the device cache: {e}")
+
+
+class ArduinoDevice:
+    """One Arduino display with its own port, baud rate, protocol, encoder and writer thread."""
+
+    def __init__(self, port_name=None, baud_rate=9600, protocol='auto',
+                 keyframe_interval=DEFAULT_KEYFRAME_INTERVAL, change_detector=None):
         self.port_name = port_name
         self.baud_rate = baud_rate
         self.serial_port = None
-        self.monitor = HardwareMonitor()
-        
-    def find_arduino_port(self):
-        """Try to find the Arduino port automatically."""
-        import glob
-        # Common Arduino port patterns on Linux
-        possible_ports = []
-        possible_ports.extend(glob.glob('/dev/ttyUSB*'))  # USB serial
-        possible_ports.extend(glob.glob('/dev/ttyACM*'))  # Arduino CDC ACM
-        
+        self.port = None  # Path actually opened (port_name may be None for auto-detection)
+
+        # Serial protocol: 'legacy' letter format, 'binary' frames, or 'auto' to negotiate
+        self.protocol = protocol
+        self.active_protocol = 'legacy'
+        self.encoder = BinaryFrameEncoder(keyframe_interval=keyframe_interval)
+        self.rx_buffer = bytearray()
+
+        # Backlight state reported by the sketch; on_display_change() is called when it changes
+        self.display_on = True
+        self.on_display_change = None
+
+        # Optional change-driven sending; None writes a frame every interval
+        self.change_detector = change_detector
+
+        # Optional Recorder for the frames sent, with this display's index in the recording
+        self.recorder = None
+        self.record_index = 0
+
+        # Last-known-good device of this port spec, so a restart neither scans nor negotiates
+        self.use_device_cache = True
+        self.cache_key = port_name or 'auto'
+        self.port_info = None  # list_ports entry (USB ids, serial number) of the connected port
+        self.hello_deadline = None  # Set while a background negotiation waits for its reply
+        self.next_hello = 0.0
+
+        # Called by the writer once the first frame was written (service readiness)
+        self.on_first_frame = None
+
+        # Frames are written (and the port reconnected) on a background thread
+        self.writer = SerialWriter(self)
+
+    def find_arduino_port(self, cached=None):
+        """Find the Arduino port from the USB ids of the serial ports, preferring the cached device."""
+        ports = list_serial_ports()
+
         # If a specific port was provided, use it
         if self.port_name:
+            self.port_info = next((info for info in ports if info.device == self.port_name), None)
             return self.port_name
-            
-        # Otherwise try to find an available port
-        for port in possible_ports:
-            try:
-                with serial.Serial(port, self.baud_rate, timeout=1) as test_port:
-                    return port
-            except serial.SerialException:
-                continue
-        
-        # If no port found, return the first one (will fail when trying to connect)
+
+        # The last-known-good board, by serial number (its ttyACM number may change) or by path
+        cached = cached or {}
+        candidates = [info for info in ports if is_arduino_usb_id(info.vid, info.pid)]
+        for info in candidates:
+            if cached.get('serial_number') and info.serial_number == cached['serial_number']:
+                self.port_info = info
+                return info.device
+        for info in candidates:
+            if info.device == cached.get('path'):
+                self.port_info = info
+                return info.device
+        if candidates:
+            self.port_info = candidates[0]
+            return candidates[0].device
+
+        # No USB ids (e.g. list_ports unavailable), fall back to the usual device names
+        import glob
+        self.port_info = None
+        possible_ports = sorted(glob.glob('/dev/ttyUSB*')) + sorted(glob.glob('/dev/ttyACM*'))
         return possible_ports[0] if possible_ports else '/dev/ttyUSB0'
 
+    def is_cached_device(self, cached, port):
+        """Return True if the cache entry describes the board now on port."""
+        if not cached or 'version' not in cached:
+            return False
+        if cached.get('serial_number') and self.port_info:
+            return self.port_info.serial_number == cached['serial_number']
+        return cached.get('path') == port
+
     def connect(self):
-        """Connect to the Arduino."""
+        """Connect to the Arduino, skipping the negotiation for the last-known-good board."""
         try:
-            port = self.find_arduino_port()
-            self.serial_port = serial.Serial(port, self.baud_rate, timeout=1)
+            cached = load_device_cache().get(self.cache_key) if self.use_device_cache else None
+            port = self.find_arduino_port(cached)
+            self.serial_port = self.open_port(port)
+            self.port = port
             print(f"Connected to Arduino on {port}")
+            self.rx_buffer.clear()
+            self.set_display_on(True)  # Until the sketch reports otherwise (with its hello reply)
+            self.hello_deadline = None
+            if self.protocol != 'auto':
+                version = BINARY_VERSION
+            elif self.is_cached_device(cached, port):
+                # Start with the cached protocol; the hello is answered (or not) while frames are written
+                version = cached['version']
+                if version:
+                    self.hello_deadline = time.monotonic() + NEGOTIATE_TIMEOUT
+                    self.next_hello = 0.0
+                # A legacy sketch gets no hello, it would only flicker the VRAM bar; a newly flashed
+                # one is picked up from the HWB<version> it announces when it boots
+            else:
+                version = self.negotiate_protocol()
+            self.active_protocol = self.protocol if self.protocol != 'auto' else ('binary' if version else 'legacy')
+            self.encoder.set_version(version or BINARY_VERSION)
+            if self.change_detector:
+                self.change_detector.reset()  # Redraw everything after the board reset
+            if self.active_protocol == 'binary':
+                print(f"Using binary protocol version {self.encoder.version}")
+            else:
+                print(f"Using {self.active_protocol} protocol")
+            if self.hello_deadline is None:
+                self.save_device()
             return True
-        except serial.SerialException as e:
+        except (serial.SerialException, OSError) as e:
             print(f"Failed to connect to Arduino: {e}")
+            self.close_port()
             return False
 
+    def save_device(self):
+        """Remember the connected board and its protocol as the last-known-good device."""
+        if not self.use_device_cache or self.protocol != 'auto':
+            return
+        info = self.port_info
+        save_device_cache(self.cache_key, {
+            'path': self.port,
+            'vid': info.vid if info else None,
+            'pid': info.pid if info else None,
+            'serial_number': info.serial_number if info else None,
+            'protocol': self.active_protocol,
+            'version': self.encoder.version if self.active_protocol == 'binary' else 0,
+        })
+
+    def open_port(self, port):
+        """Open the serial port."""
+        serial_port = serial.Serial(port, self.baud_rate, timeout=1, write_timeout=WRITE_TIMEOUT)
+        # Leave DTR up on close, so reopening the port (a service restart) does not reset the board
+        try:
+            import termios
+            attributes = termios.tcgetattr(serial_port.fileno())
+            attributes[2] &= ~termios.HUPCL
+            termios.tcsetattr(serial_port.fileno(), termios.TCSANOW, attributes)
+        except Exception:
+            pass
+        return serial_port
+
+    def close_port(self):
+        """Close the serial port after an error, without the disconnect signal."""
+        if self.serial_port:
+            try:
+                self.serial_port.close()
+            except Exception:
+                pass
+            self.serial_port = None
+
+    def read_device_messages(self):
+        """Return the complete lines the sketch has sent since the last call."""
+        waiting = self.serial_port.in_waiting
+        if waiting:
+            self.rx_buffer += self.serial_port.read(waiting)
+        *lines, rest = self.rx_buffer.split(b'\n')
+        self.rx_buffer = bytearray(rest)
+        return [line.strip() for line in lines]
+
+    def negotiate_protocol(self):
+        """Ask the sketch for binary support; return its protocol version, or None for the letter format."""
+        deadline = time.monotonic() + NEGOTIATE_TIMEOUT
+        next_hello = 0.0
+        while time.monotonic() < deadline:
+            # Repeat the hello, the first ones may be lost while the board resets
+            if time.monotonic() >= next_hello:
+                self.serial_port.write(BINARY_HELLO)
+                next_hello = time.monotonic() + NEGOTIATE_RETRY
+            version = None
+            for line in self.read_device_messages():
+                if line.startswith(BINARY_HELLO_REPLY) and line[len(BINARY_HELLO_REPLY):].isdigit():
+                    version = int(line[len(BINARY_HELLO_REPLY):]) or None
+                else:
+                    self.handle_message(line)  # e.g. the display state sent with the reply
+            if version:
+                return version
+            time.sleep(0.05)
+        return None
+
+    def handle_device_messages(self):
+        """React to messages from the sketch between frames."""
+        if self.hello_deadline is not None:
+            self.continue_negotiation()
+        for line in self.read_device_messages():
+            self.handle_message(line)
+
+    def message_timeout(self):
+        """Seconds until handle_device_messages() has work without input (the next hello), or None."""
+        if self.hello_deadline is None:
+            return None
+        return max(0.0, min(self.next_hello, self.hello_deadline) - time.monotonic())
+
+    def continue_negotiation(self):
+        """Repeat the hello of a background negotiation, falling back to legacy when it times out."""
+        now = time.monotonic()
+        if now >= self.hello_deadline:
+            self.hello_deadline = None
+            if self.active_protocol == 'binary':
+                print("No reply to the binary protocol hello, using legacy protocol")
+                self.active_protocol = 'legacy'
+                if self.change_detector:
+                    self.change_detector.reset()
+            self.save_device()
+        elif now >= self.next_hello:
+            self.serial_port.write(BINARY_HELLO)
+            self.next_hello = now + NEGOTIATE_RETRY
+
+    def handle_message(self, line):
+        """React to one line from the sketch."""
+        if line == BINARY_RESYNC:
+            self.encoder.request_keyframe()
+        elif line.startswith(BINARY_HELLO_REPLY) and line[len(BINARY_HELLO_REPLY):].isdigit():
+            # Reply to a background negotiation, or the announcement of a (re)booted sketch
+            version = int(line[len(BINARY_HELLO_REPLY):])
+            if self.protocol == 'auto' and version:
+                switched = self.active_protocol != 'binary' or min(version, BINARY_VERSION) != self.encoder.version
+                self.active_protocol = 'binary'
+                self.encoder.set_version(version)  # Also a keyframe, the sketch may have just cleared the screen
+                if self.change_detector:
+                    self.change_detector.reset()
+                if switched:
+                    print(f"Using binary protocol version {self.encoder.version}")
+                if self.hello_deadline is not None or switched:
+                    self.hello_deadline = None
+                    self.save_device()
+        elif line in (DISPLAY_OFF, DISPLAY_ON):
+            self.set_display_on(line == DISPLAY_ON)
+
+    def set_display_on(self, display_on):
+        """Record the backlight state and notify the owner if it changed."""
+        if display_on != self.display_on:
+            self.display_on = display_on
+            print(f"Display on {self.port_name or 'auto'} switched {'on' if display_on else 'off'}")
+            if self.on_display_change:
+                self.on_display_change()
+
     def disconnect(self):
         """Disconnect from the Arduino."""
         if self.serial_port and self.serial_port.is_open:
@@ -315,58 +2528,869 @@ class ArduinoCommunicator:
             self.serial_port.close()
             print("Disconnected from Arduino")
 
+    def send(self, snapshot, legacy_frame, history_page=False):
+        """Queue a frame for this device unless nothing visible changed."""
+        protocol = self.active_protocol  # Read once, the writer thread may switch it (negotiation)
+        page_changed = history_page != self.encoder.history_page and protocol == 'binary'
+        if self.change_detector and not page_changed and not self.change_detector.should_send(snapshot):
+            return
+        if protocol == 'binary':
+            if self.writer.queue.pending():
+                # The queued delta will be replaced unwritten: diff against what the writer last took instead
+                self.encoder.discard_last()
+            frame = self.encoder.encode(snapshot, history_page)
+        else:
+            frame = legacy_frame
+        if self.recorder:
+            self.recorder.record_frame(self.record_index, frame)
+        self.writer.submit(frame)
+        if self.change_detector:
+            self.change_detector.mark_sent(snapshot)
+
+    def print_stats(self):
+        """Print the frame counters of this device."""
+        name = self.port_name or 'auto-detected port'
+        if self.change_detector:
+            print(f"{name}: frames sent: {self.change_detector.sent}, suppressed: {self.change_detector.suppressed}")
+        stats = self.writer.stats()
+        print(f"{name}: frames written: {stats['frames_written']}, dropped: {stats['frames_dropped']}, "
+              f"reconnects: {stats['reconnects']}")
+
+
+# Recording file: a header record, then fixed-size records appended through a growing mmap:
+#   kind (uint8), device index (uint8), payload length (uint16 LE), seconds since start (float64 LE), payload
+RECORDING_MAGIC = b'HWREC1'
+RECORDING_HEADER = struct.Struct('<6sHd')  # magic, record size, wall clock start time
+RECORD_SIZE = 128
+RECORD_HEADER = struct.Struct('<BBHd')
+RECORD_PAYLOAD = RECORD_SIZE - RECORD_HEADER.size
+RECORD_SNAPSHOT = 1
+RECORD_FRAME = 2
+RECORD_FRAME_MORE = 3  # Continuation of a frame longer than one payload
+RECORDING_CHUNK = 4096  # Records added to the mapping each time it fills up
+# Snapshot payload: the 16 core loads, then these keys in order
+SNAPSHOT_RECORD_FIELDS = [
+    ('fps', 'H'), ('cpu_temp', 'd'), ('gpu_temp', 'd'), ('cpu_load', 'B'), ('ghz_avg', 'd'),
+    ('gpu_core_clock', 'H'), ('gpu_mem_clock', 'H'), ('gpu_load', 'd'), ('gpu_vram_percentage', 'B'),
+    ('cpu_load_min', 'd'), ('cpu_load_max', 'd'), ('cpu_load_mean', 'd'), ('cpu_temp_max', 'd'),
+    ('gpu_load_max', 'd'), ('cpu_load_spark', 'Q'),
+]
+SNAPSHOT_RECORD = struct.Struct('<16B' + ''.join(fmt for _, fmt in SNAPSHOT_RECORD_FIELDS))
+SNAPSHOT_INT_LIMITS = {'B': 0xFF, 'H': 0xFFFF, 'Q': 0xFFFFFFFFFFFFFFFF}
+
+
+def pack_snapshot(snapshot):
+    """Pack a snapshot into a record payload, clamping integer fields to their width."""
+    values = [min(max(int(load), 0), 0xFF) for load in snapshot['cpu_loads'][:16]]
+    for key, fmt in SNAPSHOT_RECORD_FIELDS:
+        value = snapshot[key]
+        values.append(min(max(int(round(value)), 0), SNAPSHOT_INT_LIMITS[fmt]) if fmt != 'd' else float(value))
+    return SNAPSHOT_RECORD.pack(*values)
+
+
+def unpack_snapshot(payload):
+    """Unpack a snapshot record payload."""
+    values = SNAPSHOT_RECORD.unpack_from(payload)
+    snapshot = {'cpu_loads': list(values[:16])}
+    snapshot.update(zip([key for key, _ in SNAPSHOT_RECORD_FIELDS], values[16:]))
+    return snapshot
+
+
+class Recorder:
+    """Append-only recording of snapshots and frames in fixed-size records, written through mmap.
+
+    The file is grown (and the mapping resized) in chunks of records, so
+    appending is a struct.pack_into into memory; unused records at the end
+    are zero, which readers take as the end of the recording. The blocks
+    of every chunk are reserved with posix_fallocate() before they are
+    mapped, so a full disk stops the recording instead of raising SIGBUS
+    on a write into the mapping. Not thread safe: snapshots and frames are
+    both recorded on the tick thread.
+    """
+
+    def __init__(self, path, chunk=RECORDING_CHUNK):
+        self.path = path
+        self.chunk = chunk
+        self.file = None
+        self.map = None
+        self.offset = RECORD_SIZE
+        self.started = None
+        self.records = 0
+
+    def open(self):
+        """Create the file with its header record and map the first chunk."""
+        import mmap
+
+        self.file = open(self.path, 'w+b')
+        try:
+            os.posix_fallocate(self.file.fileno(), 0, RECORD_SIZE * (1 + self.chunk))
+        except OSError:
+            self.file.close()
+            raise
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        RECORDING_HEADER.pack_into(self.map, 0, RECORDING_MAGIC, RECORD_SIZE, time.time())
+        self.started = time.monotonic()
+
+    def grow(self):
+        """Reserve the blocks of the next chunk, then extend the mapping over them."""
+        size = len(self.map)
+        os.posix_fallocate(self.file.fileno(), size, RECORD_SIZE * self.chunk)
+        self.map.resize(size + RECORD_SIZE * self.chunk)
+
+    def append(self, kind, index, payload, now=None):
+        """Append one record; does nothing once the recording was stopped."""
+        if self.map is None:
+            return
+        if self.offset + RECORD_SIZE > len(self.map):
+            try:
+                self.grow()
+            except OSError as e:
+                # e.g. ENOSPC: keep what was recorded and carry on without recording
+                print(f"Recording stopped, cannot grow {self.path}: {e}")
+                self.close()
+                return
+        now = time.monotonic() if now is None else now
+        RECORD_HEADER.pack_into(self.map, self.offset, kind, index, len(payload), now - self.started)
+        start = self.offset + RECORD_HEADER.size
+        self.map[start:start + len(payload)] = payload
+        self.offset += RECORD_SIZE
+        self.records += 1
+
+    def record_snapshot(self, snapshot, now=None):
+        self.append(RECORD_SNAPSHOT, 0, pack_snapshot(snapshot), now)
+
+    def record_frame(self, index, frame, now=None):
+        """Append a frame sent to a display, split over several records if needed."""
+        kind = RECORD_FRAME
+        for start in range(0, len(frame), RECORD_PAYLOAD):
+            self.append(kind, index, frame[start:start + RECORD_PAYLOAD], now)
+            kind = RECORD_FRAME_MORE
+
+    def close(self):
+        """Unmap and cut the file down to the records written."""
+        if self.map is None:
+            return
+        self.map.flush()
+        self.map.close()
+        self.map = None
+        self.file.truncate(self.offset)
+        self.file.close()
+
+
+def check_recording(path):
+    """Raise ValueError unless the file starts with a recording header."""
+    with open(path, 'rb') as f:
+        header = f.read(RECORDING_HEADER.size)
+    if len(header) < RECORDING_HEADER.size or RECORDING_HEADER.unpack(header)[0] != RECORDING_MAGIC:
+        raise ValueError(f"{path} is not a recording")
+
+
+def read_recording(path):
+    """Yield (seconds since start, kind, device index, payload) of a recording; frames are reassembled."""
+    import mmap
+
+    check_recording(path)
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            _, record_size, _ = RECORDING_HEADER.unpack_from(data, 0)
+            pending = None  # Frame waiting for its continuation records
+            for offset in range(record_size, len(data) - record_size + 1, record_size):
+                kind, index, length, timestamp = RECORD_HEADER.unpack_from(data, offset)
+                if kind == 0:
+                    break  # Unused tail of an unfinished recording
+                payload = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+                if kind == RECORD_FRAME_MORE and pending:
+                    pending[3] += payload
+                    continue
+                if pending:
+                    yield tuple(pending)
+                    pending = None
+                if kind == RECORD_FRAME:
+                    pending = [timestamp, kind, index, payload]
+                else:
+                    yield timestamp, kind, index, payload
+            if pending:
+                yield tuple(pending)
+
+
+REPLAY_SINKS = ['null', 'pty']  # Anything else is a serial port path
+
+
+class NullPort:
+    """Serial port stand-in discarding everything written to it."""
+
+    is_open = True
+    in_waiting = 0
+
+    def write(self, data):
+        return len(data)
+
+    def read(self, size=1):
+        return b''
+
+    def close(self):
+        self.is_open = False
+
+
+class PtyPort:
+    """Master side of a raw pseudo terminal; a sketch simulator or parser opens slave_name."""
+
+    def __init__(self):
+        import tty
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # No newline or control character translation
+        self.slave_name = os.ttyname(self.slave)
+        os.set_blocking(self.master, False)
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        import fcntl
+        import termios
+
+        return struct.unpack('i', fcntl.ioctl(self.master, termios.FIONREAD, b'\0\0\0\0'))[0]
+
+    def fileno(self):
+        return self.master
+
+    def write(self, data):
+        try:
+            return os.write(self.master, data)
+        except BlockingIOError:
+            return 0  # Nobody is reading, drop it like an unattended serial line would
+
+    def read(self, size=1):
+        try:
+            return os.read(self.master, size)
+        except (BlockingIOError, OSError):
+            return b''
+
+    def close(self):
+        close_fds([self.master, self.slave])
+        self.is_open = False
+
+
+class ReplayDevice(ArduinoDevice):
+    """ArduinoDevice writing to a null or pty sink instead of a serial port."""
+
+    def __init__(self, sink, protocol='auto', keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+        # A null sink never answers the negotiation
+        if sink == 'null' and protocol == 'auto':
+            protocol = 'binary'
+        super().__init__(port_name=sink, protocol=protocol, keyframe_interval=keyframe_interval)
+        self.use_device_cache = False
+
+    def find_arduino_port(self, cached=None):
+        return self.port_name
+
+    def open_port(self, port):
+        if port == 'null':
+            return NullPort()
+        pty = PtyPort()
+        print(f"Replaying to {pty.slave_name}")
+        return pty
+
+
+class Replayer:
+    """Push a recording through the encoders (or verbatim) into a display's serial writer.
+
+    Snapshots are loaded into a HardwareMonitor without sensors with
+    apply_snapshot(), so the letter format comes from get_formatted_data
+    and binary frames from the device's BinaryFrameEncoder, exactly as
+    when sampling. speed scales the recorded timing, 0 replays as fast
+    as possible.
+    """
+
+    def __init__(self, path, device, speed=1.0, frames=False):
+        check_recording(path)
+        self.path = path
+        self.device = device
+        self.speed = speed
+        self.frames = frames  # Replay the recorded frames of the first display instead of the snapshots
+        self.monitor = HardwareMonitor(gpu_backend='none')
+        self.replayed = 0
+
+    def run(self):
+        """Replay the whole recording, then print throughput and writer counters."""
+        self.device.writer.start()
+        deadline = time.monotonic() + NEGOTIATE_TIMEOUT + 1
+        while not self.device.writer.connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        try:
+            for timestamp, kind, index, payload in read_recording(self.path):
+                if self.speed:
+                    delay = started + timestamp / self.speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                if self.frames and kind == RECORD_FRAME and index == 0:
+                    self.device.writer.submit(bytes(payload))
+                elif not self.frames and kind == RECORD_SNAPSHOT:
+                    snapshot = unpack_snapshot(payload)
+                    self.monitor.apply_snapshot(snapshot)
+                    self.device.send(snapshot, self.monitor.get_formatted_data().encode())
+                else:
+                    continue
+                self.replayed += 1
+                # Unlike live sampling, every frame must reach the sink
+                self.device.writer.queue.wait_taken(WRITE_TIMEOUT)
+        except KeyboardInterrupt:
+            print("\nStopping replay...")
+        finally:
+            elapsed = max(time.monotonic() - started, 1e-9)
+            time.sleep(0.1)  # Let the writer finish the last frame
+            self.device.writer.stop()
+            stats = self.device.writer.stats()
+            print(f"Replayed {self.replayed} {'frames' if self.frames else 'snapshots'} in {elapsed:.2f} s "
+                  f"({self.replayed / elapsed:.0f}/s), written: {stats['frames_written']} frames, "
+                  f"{stats['bytes_written']} bytes, dropped: {stats['frames_dropped']}")
+            self.device.close_port()
+            self.monitor.close()
+
+
+READY_TIMEOUT = 2.0  # Report the service ready without a display after this long
+
+
+def sd_notify(state):
+    """Send a state change (e.g. 'READY=1') to systemd; does nothing unless started as Type=notify."""
+    address = os.environ.get('NOTIFY_SOCKET')
+    if not address:
+        return False
+    import socket
+    if address.startswith('@'):
+        address = '\0' + address[1:]  # Abstract namespace socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(state.encode())
+        return True
+    except OSError:
+        return False
+
+
+def process_age():
+    """Return the seconds since this process was started (interpreter startup included), or None."""
+    try:
+        with open('/proc/self/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')  # starttime, in clock ticks since boot
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class ArduinoCommunicator:
+    """Sample the hardware once per tick and fan the frame out to every attached display."""
+
+    def __init__(self, port_name=None, baud_rate=9600, gpu_stream_interval=None, collector_periods=None,
+                 protocol='auto', keyframe_interval=DEFAULT_KEYFRAME_INTERVAL, change_detection=None,
+                 ports=None, metrics_listen=None, history_window=DEFAULT_HISTORY_WINDOW, history_page=0,
+                 gpu_backend='auto', fps_source=None, adaptive=None, record=None):
+        self.baud_rate = baud_rate
+        self.protocol = protocol
+        self.keyframe_interval = keyframe_interval
+        self.monitor = HardwareMonitor(gpu_stream_interval=gpu_stream_interval, gpu_backend=gpu_backend,
+                                       fps_source=fps_source)
+
+        # Seconds covered by the history aggregates, and how long each page is shown (0 = live page only)
+        self.history_window = history_window
+        self.history_page = history_page
+
+        # ChangeDetector arguments for each device; None writes a frame every interval
+        self.change_detection = change_detection
+
+        # Port specs ('PATH[:BAUD[:PROTOCOL]]', PATH may be a glob); None auto-detects one port
+        self.port_specs = ports or [port_name]
+        self.devices = {}
+        self.last_rescan = None
+        self.ticker = None
+        self.interval = None
+
+        # Optional adaptive periods: {'max_interval': ms or None, 'max_periods': {collector: ms}}
+        self.adaptive = adaptive
+        self.tick_rate = None
+        self.display_off = False  # Every display reported its backlight off
+        self.display_lock = threading.Lock()  # display_changed() is called from every writer thread
+
+        # Service readiness: sent to systemd with the first frame, or after READY_TIMEOUT without one
+        self.ready = False
+        self.first_frame = False
+
+        # Optional recording of every snapshot and frame, for Replayer
+        self.recorder = Recorder(record) if record else None
+
+        # Optional Prometheus endpoint serving the values already collected
+        self.metrics_server = MetricsServer(self, metrics_listen) if metrics_listen else None
+
+        # The loads (and history) are always sampled in the background at a fixed period; the other
+        # collectors too with collector_periods, otherwise once per tick on the send thread
+        self.tick_collectors = None
+        if collector_periods is None:
+            self.tick_collectors = [name for name in self.monitor.collectors() if name not in FIXED_RATE_COLLECTORS]
+        self.scheduler = CollectorScheduler.for_monitor(
+            self.monitor, periods=collector_periods, max_periods=adaptive['max_periods'] if adaptive else None,
+            names=FIXED_RATE_COLLECTORS if self.tick_collectors is not None else None)
+
+    def add_device(self, port_name, baud_rate, protocol):
+        """Create a device and start its writer thread."""
+        change_detector = None
+        if self.change_detection is not None:
+            change_detector = ChangeDetector(**self.change_detection)
+        device = ArduinoDevice(port_name=port_name, baud_rate=baud_rate, protocol=protocol,
+                               keyframe_interval=self.keyframe_interval, change_detector=change_detector)
+        device.on_display_change = self.display_changed
+        device.on_first_frame = self.first_frame_written
+        device.recorder = self.recorder
+        device.record_index = min(len(self.devices), 0xFF)
+        self.devices[port_name] = device
+        self.display_changed()
+        device.writer.start()
+        return device
+
+    def display_changed(self):
+        """Pause the expensive collectors (and slow the tick) while every display is off."""
+        with self.display_lock:
+            # Serialized, so the last of two displays switching at once sees both new states
+            devices = list(self.devices.values())
+            display_off = bool(devices) and not any(device.display_on for device in devices)
+            if display_off != self.display_off:
+                self.display_off = display_off
+                self.apply_display_state(display_off)
+
+    def apply_display_state(self, display_off):
+        """Pause or resume the collectors and background sources for the new display state."""
+        if display_off:
+            print(f"All displays off, pausing collectors: {', '.join(DISPLAY_OFF_PAUSED)}")
+            self.monitor.paused.update(DISPLAY_OFF_PAUSED)
+            self.scheduler.pause(DISPLAY_OFF_PAUSED)
+            self.monitor.stop_background_sources()
+            if self.ticker and self.tick_rate:
+                self.ticker.set_period(self.tick_rate.max_period)
+        else:
+            print("Display on, resuming collectors")
+            self.monitor.paused.difference_update(DISPLAY_OFF_PAUSED)
+            self.monitor.start_background_sources()
+            self.scheduler.resume(DISPLAY_OFF_PAUSED)
+            if self.tick_rate:
+                self.tick_rate.reset()
+            if self.ticker:
+                self.ticker.set_period(self.interval, wake=True)  # Redraw right away
+
+    def first_frame_written(self, device):
+        """Report the service ready once a display shows data, with the time it took since startup."""
+        if self.first_frame:
+            return
+        self.first_frame = True
+        age = process_age()
+        print(f"First frame written to {device.port}" + (f" {age * 1000:.0f} ms after startup" if age else ""))
+        self.notify_ready(f"Displaying on {device.port}")
+
+    def notify_ready(self, status):
+        """Tell systemd the service is up (READY=1 only the first time) and what it is doing."""
+        state = f"STATUS={status}" if self.ready else f"READY=1\nSTATUS={status}"
+        self.ready = True
+        sd_notify(state)
+
+    def refresh_devices(self):
+        """Create devices for port specs, expanding globs to the ports currently present."""
+        import glob
+        self.last_rescan = time.monotonic()
+        for spec in self.port_specs:
+            if spec is None:
+                if None not in self.devices:
+                    self.add_device(None, self.baud_rate, self.protocol)
+                continue
+
+            path, baud_rate, protocol = parse_port_spec(spec, self.baud_rate, self.protocol)
+            paths = sorted(glob.glob(path)) if is_port_glob(path) else [path]
+            for port in paths:
+                if port not in self.devices:
+                    self.add_device(port, baud_rate, protocol)
+
     def send_data(self):
-        """Send hardware data to Arduino."""
-        if not self.serial_port or not self.serial_port.is_open:
-            return False
-            
+        """Sample hardware data once and queue the frame for every device."""
         try:
-            self.monitor.get_system_info()
-            data = self.monitor.get_formatted_data()
-            self.serial_port.write(data.encode())
+            if self.tick_collectors:
+                self.monitor.get_system_info(self.tick_collectors)
+
+            snapshot = self.monitor.snapshot()
+            if self.recorder:
+                self.recorder.record_snapshot(snapshot)
+            legacy_frame = None
+            # Every device not locked to binary may be (or switch to) the letter format at any time
+            if any(device.protocol != 'binary' for device in self.devices.values()):
+                legacy_frame = self.monitor.get_formatted_data().encode()
+
+            # Alternate between the live and history pages on binary displays
+            history_page = bool(self.history_page) and int(time.monotonic() / self.history_page) % 2 == 1
+            for device in self.devices.values():
+                device.send(snapshot, legacy_frame, history_page)
             return True
-        except serial.SerialException as e:
-            print(f"Error sending data: {e}")
-            return False
         except Exception as e:
             print(f"Unexpected error: {e}")
             return False
 
     def run(self, interval=1000):
         """Main loop to continuously send data."""
-        if not self.connect():
-            return
-            
         print("Starting hardware monitoring...")
         print("Press Ctrl+C to stop")
-        
+
+        # History is sampled with the loads, at a fixed period whatever the tick does
+        self.monitor.configure_history(self.history_window, self.scheduler.period_of('loads'))
+
+        if self.recorder:
+            try:
+                self.recorder.open()
+                print(f"Recording to {self.recorder.path}")
+            except OSError as e:
+                print(f"Cannot record to {self.recorder.path}: {e}")
+                self.recorder = None
+
+        # Connecting (and reconnecting) happens on the writer thread of each device
+        self.refresh_devices()
+        has_globs = any(spec and is_port_glob(parse_port_spec(spec)[0]) for spec in self.port_specs)
+        self.scheduler.start()
+
+        self.interval = interval
+        self.ticker = TickScheduler(interval)
+        tick_readings = None
+        if self.adaptive is not None:
+            # The tick slows down while the displayed values stay flat
+            attributes, band = ADAPTIVE_TICK_BAND
+            self.tick_rate = AdaptiveRate(interval, self.adaptive.get('max_interval') or
+                                          interval * ADAPTIVE_MAX_FACTOR, band)
+            tick_readings = attribute_reader(self.monitor, attributes)
+        if self.metrics_server:
+            try:
+                self.metrics_server.start()
+            except OSError as e:
+                # The display keeps working without the endpoint
+                print(f"Cannot serve metrics on {self.metrics_server.listen}: {e}")
+                self.metrics_server = None
+        ready_deadline = time.monotonic() + READY_TIMEOUT
+        # Announced from here once detected, whichever thread needed it first
+        gpu_announced = self.monitor.gpu_backend_args[0] == 'none'
         try:
             while self.monitor.running:
-                if not self.send_data():
-                    print("Failed to send data, attempting to reconnect...")
-                    time.sleep(1)
-                    if not self.connect():
-                        time.sleep(5)  # Wait longer before retrying
-                        continue
-                
-                time.sleep(interval / 1000.0)  # Convert milliseconds to seconds
+                self.ticker.wait()
+                if has_globs and time.monotonic() - self.last_rescan >= DEVICE_RESCAN_INTERVAL:
+                    self.refresh_devices()
+                self.send_data()
+                if not gpu_announced and self.monitor.detected_gpu_backend():
+                    print(f"GPU backend: {self.monitor.detected_gpu_backend().describe()}")
+                    gpu_announced = True
+                if self.tick_rate and not self.display_off:
+                    self.ticker.set_period(self.tick_rate.update(tick_readings()))
+                if not self.ready and time.monotonic() >= ready_deadline:
+                    # No display (yet): the service still runs and keeps reconnecting in the background
+                    self.notify_ready("Waiting for a display")
         except KeyboardInterrupt:
             print("\nStopping hardware monitoring...")
         finally:
-            self.disconnect()
+            sd_notify("STOPPING=1")
+            if self.metrics_server:
+                self.metrics_server.stop()
+            self.scheduler.stop()
+            for device in self.devices.values():
+                device.writer.stop()
+                device.print_stats()
+                device.disconnect()
+            ticks = self.ticker.stats()
+            if ticks['measured_period'] is not None:
+                print(f"Tick period: {ticks['measured_period'] * 1000:.1f} ms, "
+                      f"jitter p50/p99: {ticks['jitter_p50'] * 1000:.1f}/{ticks['jitter_p99'] * 1000:.1f} ms, "
+                      f"overruns: {ticks['overruns']}, skipped: {ticks['skipped']}")
+            if self.recorder:
+                self.recorder.close()
+                print(f"Recorded {self.recorder.records} records to {self.recorder.path}")
+            self.monitor.close()
+
+
+METRICS_PREFIX = 'arduino_hw_'
+
+
+def format_labels(labels):
+    """Format a label dict as a Prometheus label set."""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+def add_metric(lines, name, kind, help_text, samples):
+    """Append one metric family; samples are (labels dict, value) pairs, None values are skipped."""
+    lines.append(f"# HELP {METRICS_PREFIX}{name} {help_text}")
+    lines.append(f"# TYPE {METRICS_PREFIX}{name} {kind}")
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{METRICS_PREFIX}{name}{format_labels(labels)} {value}")
+
+
+def add_histogram(lines, name, help_text, histograms):
+    """Append a histogram family; histograms are (labels dict, LatencyHistogram) pairs."""
+    lines.append(f"# HELP {METRICS_PREFIX}{name} {help_text}")
+    lines.append(f"# TYPE {METRICS_PREFIX}{name} histogram")
+    for labels, histogram in histograms:
+        buckets, total_sum, total_count = histogram.cumulative()
+        for bound, count in buckets:
+            lines.append(f"{METRICS_PREFIX}{name}_bucket{format_labels(dict(labels, le=bound))} {count}")
+        lines.append(f"{METRICS_PREFIX}{name}_sum{format_labels(labels)} {total_sum}")
+        lines.append(f"{METRICS_PREFIX}{name}_count{format_labels(labels)} {total_count}")
+
+
+def render_metrics(communicator):
+    """Render the latest snapshot and loop health in Prometheus text format, without sampling."""
+    monitor = communicator.monitor
+    lines = []
+
+    # Collected values
+    add_metric(lines, 'cpu_temperature_celsius', 'gauge', 'CPU package temperature.',
+               [({}, monitor.cpu_package_temp)])
+    add_metric(lines, 'cpu_load_percent', 'gauge', 'Total CPU load.', [({}, monitor.cpu_total_load)])
+    add_metric(lines, 'cpu_core_load_percent', 'gauge', 'Per-core CPU load.',
+               [({'cpu': cpu}, load) for cpu, load in enumerate(monitor.cpu_loads_all)])
+    add_metric(lines, 'cpu_frequency_ghz', 'gauge', 'CPU frequency over all online cores.',
+               [({'stat': 'avg'}, monitor.ghz_avg), ({'stat': 'min'}, monitor.ghz_min),
+                ({'stat': 'max'}, monitor.ghz_max)])
+    add_metric(lines, 'gpu_temperature_celsius', 'gauge', 'GPU temperature.', [({}, monitor.gpu_temp)])
+    add_metric(lines, 'gpu_load_percent', 'gauge', 'GPU utilization.', [({}, monitor.gpu_load)])
+    add_metric(lines, 'gpu_clock_mhz', 'gauge', 'GPU clocks.',
+               [({'clock': 'core'}, monitor.gpu_core_clock), ({'clock': 'memory'}, monitor.gpu_mem_clock)])
+    add_metric(lines, 'gpu_vram_mib', 'gauge', 'GPU video memory.',
+               [({'kind': 'used'}, monitor.gpu_vram_used), ({'kind': 'total'}, monitor.gpu_vram_total)])
+    add_metric(lines, 'gpu_sample_age_seconds', 'gauge', 'Age of the current GPU sample.',
+               [({}, monitor.gpu_sample_age)])
+    add_metric(lines, 'gpu_backend_info', 'gauge', 'GPU backend detected on first use.',
+               [({'backend': monitor.gpu_backend.name}, 1)])
+    add_metric(lines, 'fps', 'gauge', 'Frames per second.', [({}, monitor.fps)])
+    add_metric(lines, 'fps_low', 'gauge', '1% low frames per second.', [({}, monitor.fps_low)])
+
+    # Collectors
+    add_histogram(lines, 'collector_duration_seconds', 'Duration of collector runs.',
+                  [({'collector': name}, histogram) for name, histogram in monitor.collector_latency.items()])
+    status = communicator.scheduler.status()
+    add_metric(lines, 'collector_last_success_age_seconds', 'gauge', 'Time since the last successful run.',
+               [({'collector': name}, s['age']) for name, s in status.items()])
+    add_metric(lines, 'collector_failures_total', 'counter', 'Collector runs that raised.',
+               [({'collector': name}, s['failures']) for name, s in status.items()])
+    add_metric(lines, 'collector_timeouts_total', 'counter', 'Collector runs that exceeded their timeout.',
+               [({'collector': name}, s['timeouts']) for name, s in status.items()])
+    add_metric(lines, 'collector_period_seconds', 'gauge', 'Current collector period.',
+               [({'collector': name}, s['period']) for name, s in status.items()])
+    add_metric(lines, 'collector_paused', 'gauge', 'Whether the collector is paused (displays off).',
+               [({'collector': name}, int(s['paused'])) for name, s in status.items()])
+
+    # Serial devices
+    devices = list(communicator.devices.values())
+    add_histogram(lines, 'serial_write_duration_seconds', 'Duration of serial writes.',
+                  [({'port': d.port_name or 'auto'}, d.writer.write_latency) for d in devices])
+    for name, kind, help_text, attribute in [
+            ('serial_connected', 'gauge', 'Whether the display is connected.', 'connected'),
+            ('serial_bytes_written_total', 'counter', 'Bytes written to the display.', 'bytes_written'),
+            ('serial_frames_written_total', 'counter', 'Frames written to the display.', 'frames_written'),
+            ('serial_frames_dropped_total', 'counter', 'Frames replaced before being written.', 'frames_dropped'),
+            ('serial_write_errors_total', 'counter', 'Failed serial writes.', 'write_errors'),
+            ('serial_reconnects_total', 'counter', 'Reconnects after a lost connection.', 'reconnects')]:
+        add_metric(lines, name, kind, help_text,
+                   [({'port': d.port_name or 'auto'}, int(getattr(d.writer, attribute))) for d in devices])
+    add_metric(lines, 'display_on', 'gauge', 'Whether the display backlight is on, as reported by the sketch.',
+               [({'port': d.port_name or 'auto'}, int(d.display_on)) for d in devices])
+
+    # Main loop
+    if communicator.ticker:
+        ticks = communicator.ticker.stats()
+        add_metric(lines, 'ticks_total', 'counter', 'Main loop ticks.', [({}, ticks['ticks'])])
+        add_metric(lines, 'tick_overruns_total', 'counter', 'Ticks whose work overran the period.',
+                   [({}, ticks['overruns'])])
+        add_metric(lines, 'ticks_skipped_total', 'counter', 'Ticks skipped after an overrun.',
+                   [({}, ticks['skipped'])])
+        add_metric(lines, 'tick_period_seconds', 'gauge', 'Measured tick period.',
+                   [({}, ticks['measured_period'])])
+        add_metric(lines, 'tick_target_period_seconds', 'gauge', 'Current tick period target.',
+                   [({}, ticks['period'])])
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serve render_metrics() over HTTP on 'HOST:PORT' or a Unix socket ('unix:/path')."""
+
+    def __init__(self, communicator, listen):
+        self.communicator = communicator
+        self.listen = listen
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Bind the socket and serve requests on a background thread."""
+        import http.server
+        import socket
+        import socketserver
+
+        communicator = self.communicator
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = render_metrics(communicator).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the service log
+
+        if self.listen.startswith('unix:'):
+            path = self.listen[len('unix:'):]
+            remove_stale_socket(path, socket.SOCK_STREAM)
+
+            class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+                daemon_threads = True
+
+            class UnixHandler(Handler):
+                def address_string(self):
+                    return path
+
+            self.server = UnixHTTPServer(path, UnixHandler)
+        else:
+            host, _, port = self.listen.rpartition(':')
+            self.server = http.server.ThreadingHTTPServer((host or '127.0.0.1', int(port)), Handler)
+            self.server.daemon_threads = True
+
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True)
+        self.thread.start()
+        print(f"Serving metrics on {self.listen}")
+
+    def stop(self):
+        """Shut the server down and remove its Unix socket."""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            if self.listen.startswith('unix:'):
+                try:
+                    os.unlink(self.listen[len('unix:'):])
+                except OSError:
+                    pass
 
 
 def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Hardware Monitor for Arduino on Linux')
-    parser.add_argument('--port', '-p', help='Serial port for Arduino (e.g., /dev/ttyUSB0 or /dev/ttyACM0)')
+    parser.add_argument('--port', '-p', action='append',
+                        help='Serial port for Arduino (e.g., /dev/ttyUSB0 or /dev/ttyACM0), optionally '
+                             'PORT:BAUD[:PROTOCOL]; may be a glob and may be given multiple times')
     parser.add_argument('--baud', '-b', type=int, default=9600, help='Baud rate (default: 9600)')
     parser.add_argument('--interval', '-i', type=int, default=1000, help='Update interval in milliseconds (default: 1000)')
+    parser.add_argument('--gpu-backend', choices=GPU_BACKENDS, default='auto',
+                        help='GPU source: nvidia-smi, amdgpu or Intel (i915/xe) sysfs, or none (default: auto)')
+    parser.add_argument('--gpu-stream', action='store_true',
+                        help='Keep one nvidia-smi process running instead of spawning one per update')
+    
+    parser.add_argument('--fps-source', metavar='SOURCE',
+                        help='Frame times for the FPS field: mangohud:DIR (MangoHud output_folder) or unix:PATH')
+    
+    parser.add_argument('--protocol', choices=PROTOCOLS, default='auto',
+                        help='Serial protocol: negotiate (auto), letter format (legacy) or binary frames (default: auto)')
+    parser.add_argument('--keyframe-interval', type=int, default=DEFAULT_KEYFRAME_INTERVAL,
+                        help=f'Send a full binary frame every N frames (default: {DEFAULT_KEYFRAME_INTERVAL})')
+    parser.add_argument('--on-change', action='store_true',
+                        help='Only send a frame when a displayed value changed or the heartbeat expired')
+    parser.add_argument('--heartbeat', type=int, default=DEFAULT_HEARTBEAT,
+                        help=f'With --on-change, resend at least every N milliseconds (default: {DEFAULT_HEARTBEAT})')
+    parser.add_argument('--coalesce', type=int, default=DEFAULT_COALESCE,
+                        help=f'With --on-change, minimum milliseconds between frames (default: {DEFAULT_COALESCE})')
+    parser.add_argument('--metrics-listen', metavar='ADDR',
+                        help='Serve Prometheus metrics on HOST:PORT or unix:/path/to/socket')
+    parser.add_argument('--history-window', type=int, default=DEFAULT_HISTORY_WINDOW,
+                        help=f'Seconds covered by the min/avg/max and sparkline history (default: {DEFAULT_HISTORY_WINDOW})')
+    parser.add_argument('--history-page', type=int, default=0, metavar='SECONDS',
+                        help='With binary protocol 2, alternate live and history pages every N seconds (default: off)')
+    parser.add_argument('--record', metavar='FILE', help='Record every snapshot and frame sent to FILE')
+    parser.add_argument('--replay', metavar='FILE', help='Replay a recording instead of sampling the hardware')
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help='Replay speed factor, 0 replays as fast as possible (default: 1)')
+    parser.add_argument('--replay-sink', default='null',
+                        help='Replay to null, pty (prints the path to open) or a serial port (default: null)')
+    parser.add_argument('--replay-frames', action='store_true',
+                        help='Replay the recorded frames of the first display verbatim instead of the snapshots')
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Sample each source on its own period in the background')
+    parser.add_argument('--collector-period', action='append', default=[], metavar='NAME=MS[:MAX_MS]',
+                        help='Sampling period of a collector (loads, temps, freqs, gpu, fps) in --concurrent mode, and '
+                             'its maximum with --adaptive; loads also sets the history rate and never adapts')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Lengthen the update interval (and collector periods with --concurrent) while values stay flat')
+    parser.add_argument('--max-interval', type=int, metavar='MS',
+                        help=f'With --adaptive, longest update interval (default: {ADAPTIVE_MAX_FACTOR} x --interval)')
     
     args = parser.parse_args()
+    if args.interval <= 0:
+        parser.error("--interval must be a positive number of milliseconds")
+    if args.max_interval is not None and args.max_interval <= 0:
+        parser.error("--max-interval must be a positive number of milliseconds")
+
+    if args.replay:
+        if args.replay_sink in REPLAY_SINKS:
+            device = ReplayDevice(args.replay_sink, protocol=args.protocol, keyframe_interval=args.keyframe_interval)
+        else:
+            path, baud_rate, protocol = parse_port_spec(args.replay_sink, args.baud, args.protocol)
+            device = ArduinoDevice(port_name=path, baud_rate=baud_rate, protocol=protocol,
+                                   keyframe_interval=args.keyframe_interval)
+        try:
+            Replayer(args.replay, device, speed=args.replay_speed, frames=args.replay_frames).run()
+        except (OSError, ValueError) as e:
+            print(f"Cannot replay {args.replay}: {e}")
+            sys.exit(1)
+        return
+
+    collector_periods = None
+    max_periods = {}
+    if args.concurrent or args.collector_period:
+        collector_periods = {}
+        for item in args.collector_period:
+            name, _, period = item.partition('=')
+            period, _, max_period = period.partition(':')
+            if name not in DEFAULT_COLLECTOR_PERIODS or not period.isdigit() or not (max_period or '1').isdigit():
+                parser.error(f"invalid --collector-period '{item}'")
+            if int(period) <= 0 or (max_period and int(max_period) <= 0):
+                parser.error(f"invalid --collector-period '{item}': periods must be positive")
+            collector_periods[name] = int(period)
+            if max_period:
+                max_periods[name] = int(max_period)
+
+    for spec in args.port or []:
+        try:
+            parse_port_spec(spec)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.fps_source:
+        try:
+            parse_fps_source(args.fps_source)
+        except ValueError as e:
+            parser.error(str(e))
     
-    communicator = ArduinoCommunicator(port_name=args.port, baud_rate=args.baud)
+    try:
+        communicator = ArduinoCommunicator(ports=args.port, baud_rate=args.baud,
+                                           gpu_stream_interval=args.interval if args.gpu_stream else None,
+                                           collector_periods=collector_periods,
+                                           protocol=args.protocol, keyframe_interval=args.keyframe_interval,
+                                           change_detection=dict(heartbeat=args.heartbeat, coalesce=args.coalesce)
+                                           if args.on_change else None,
+                                           metrics_listen=args.metrics_listen,
+                                           history_window=args.history_window, history_page=args.history_page,
+                                           gpu_backend=args.gpu_backend, fps_source=args.fps_source,
+                                           adaptive=dict(max_interval=args.max_interval, max_periods=max_periods)
+                                           if args.adaptive else None,
+                                           record=args.record)
+    except OSError as e:
+        # e.g. the --fps-source socket cannot be bound
+        print(f"Cannot start hardware monitoring: {e}")
+        sys.exit(1)
+    # systemd stops the service with SIGTERM: shut down like Ctrl+C, so the display gets its disconnect
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     communicator.run(interval=args.interval)
 
 
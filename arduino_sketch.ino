@@ -5,6 +5,49 @@ LiquidCrystal_I2C lcd(0x27, 2, 1, 0, 4, 5, 6, 7, 3, POSITIVE);
 String inData;
 bool disconnected;
 
+//Binary protocol (see BINARY_* in arduino_hw_info.py)
+//start byte, version, flags, field bitmap (uint32 LE), present fields (LE), CRC-8
+#define FRAME_START 0xA5
+#define FRAME_VERSION 2
+#define FRAME_HEADER 7
+#define FRAME_FIELDS 31
+#define FLAG_HISTORY_PAGE 0x02
+#define FRAME_TIMEOUT_MS 50
+#define STRAY_IDLE_MS 1000 //After a valid frame, stray bytes are dropped unless the line was idle this long
+const byte fieldWidth[FRAME_FIELDS] = {
+  1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, //Per core load
+  2, //FPS
+  1, //CPU Temp
+  1, //GPU Temp
+  1, //CPU Load
+  1, //CPU Average Frequency (tenths of GHz)
+  2, //GPU Core Frequency
+  2, //GPU Memory Frequency
+  1, //GPU Load
+  1, //GPU Video Memory Usage Percentage
+  1, //CPU Load min over the history window
+  1, //CPU Load max over the history window
+  1, //CPU Load average over the history window
+  1, //CPU Temp max over the history window
+  1, //GPU Load max over the history window
+  6, //CPU Load sparkline: 16 loadbar levels of 3 bits
+};
+byte frameBuf[FRAME_HEADER + 2 * FRAME_FIELDS + 1];
+byte frameLen = 0;
+byte frameExpected = 0;
+unsigned long lastFrameByte = 0;
+bool historyPage = false;
+bool binarySeen = false; //A valid frame arrived, so stray bytes are a desync and not letter format
+char strayTail[5] = {0}; //Last stray bytes, for the commands still understood in binary mode
+
+//Optional push button (to GND) toggling the backlight, set to -1 if not fitted
+//The host is told with "D0\n" (off) / "D1\n" (on) and pauses its expensive sensors while off
+#define BACKLIGHT_BUTTON_PIN 2
+#define DEBOUNCE_MS 50
+bool displayOn = true;
+byte lastButton = HIGH;
+unsigned long lastButtonChange = 0;
+
 //0% custom character
 byte zero[8] = {
   B00000,
@@ -101,6 +144,214 @@ void printCharacter(int x){
   inData = "";
 }
 
+//Print a 0-100 value as a loadbar character
+void drawBar(int x, int y, int value){
+  lcd.setCursor(x,y);
+  if (value == 0) lcd.write(byte(0));
+  else if (value < 14) lcd.write(byte(1));
+  else if (value < 28) lcd.write(byte(2));
+  else if (value < 42) lcd.write(byte(3));
+  else if (value < 57) lcd.write(byte(4));
+  else if (value < 71) lcd.write(byte(5));
+  else if (value < 85) lcd.write(byte(6));
+  else lcd.write(byte(7));
+}
+
+//Print a value right aligned in 3 characters
+void printRight3(int x, int y, unsigned int value){
+  lcd.setCursor(x,y);
+  if (value < 10) lcd.print("  ");
+  else if (value < 100) lcd.print(" ");
+  lcd.print(value);
+}
+
+//Print a clock in MHz, padded to 4 characters
+void printClock(int x, int y, unsigned int value){
+  lcd.setCursor(x,y);
+  if (value < 1000) lcd.print(" ");
+  lcd.print(value);
+}
+
+//CRC-8, polynomial 0x07 (same as crc8() in arduino_hw_info.py)
+byte crc8(const byte *data, byte len){
+  byte crc = 0;
+  for (byte i = 0; i < len; i++) {
+    crc ^= data[i];
+    for (byte b = 0; b < 8; b++) {
+      crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : (crc << 1);
+    }
+  }
+  return crc;
+}
+
+//History Page Layout
+void drawHistoryLayout(){
+  lcd.clear();
+  lcd.setCursor(0,0);
+  lcd.print("CPU%  MIN  AVG  MAX ");
+  lcd.setCursor(0,2);
+  lcd.print("Tmax 00 C GPUmax 000");
+  lcd.setCursor(7,2);
+  lcd.print((char)223);
+  lcd.setCursor(1,3);
+  lcd.print("[");
+  lcd.setCursor(18,3);
+  lcd.print("]");
+}
+
+//Draw every field present in a verified binary frame
+void applyFrame(){
+  //Switch page layout when the host asks for it
+  bool history = frameBuf[2] & FLAG_HISTORY_PAGE;
+  if (history != historyPage) {
+    historyPage = history;
+    if (historyPage) drawHistoryLayout();
+    else clearScreen();
+  }
+
+  unsigned long bitmap = (unsigned long)frameBuf[3] | ((unsigned long)frameBuf[4] << 8) |
+                         ((unsigned long)frameBuf[5] << 16) | ((unsigned long)frameBuf[6] << 24);
+  byte pos = FRAME_HEADER;
+  for (byte i = 0; i < FRAME_FIELDS; i++) {
+    if (!(bitmap & (1UL << i))) continue;
+    unsigned int value = frameBuf[pos];
+    if (fieldWidth[i] == 2) value |= (unsigned int)frameBuf[pos + 1] << 8;
+    pos += fieldWidth[i];
+
+    if (i < 16) {
+      drawBar(2 + i, 3, value);
+      continue;
+    }
+    if (i == 30) {
+      //Sparkline bins, oldest first, each already a loadbar character
+      for (byte bin = 0; bin < 16; bin++) {
+        byte bit = bin * 3;
+        unsigned int bits = frameBuf[pos - 6 + bit / 8] | ((unsigned int)frameBuf[pos - 5 + bit / 8] << 8);
+        lcd.setCursor(2 + bin, 3);
+        lcd.write(byte((bits >> (bit % 8)) & 7));
+      }
+      continue;
+    }
+    switch (i) {
+      case 16: //FPS
+        printRight3(17, 0, value);
+        break;
+      case 17: //CPU Temp
+        lcd.setCursor(5,2);
+        if (value < 10) lcd.print(" ");
+        lcd.print(value);
+        lcd.setCursor(7,2);
+        lcd.print((char)223);
+        lcd.setCursor(8,2);
+        lcd.print("C ");
+        break;
+      case 18: //GPU Temp
+        lcd.setCursor(5,0);
+        if (value < 10) lcd.print(" ");
+        lcd.print(value);
+        break;
+      case 19: //CPU Load
+        printRight3(16, 2, value);
+        break;
+      case 20: //CPU Average Frequency
+        lcd.setCursor(10,2);
+        lcd.print(value / 10);
+        lcd.print(".");
+        lcd.print(value % 10);
+        break;
+      case 21: //GPU Core Frequency
+        printClock(0, 1, value);
+        break;
+      case 22: //GPU Memory Frequency
+        printClock(8, 1, value);
+        break;
+      case 23: //GPU Load
+        printRight3(16, 1, value);
+        break;
+      case 24: //GPU Video Memory Usage Percentage
+        drawBar(12, 0, value);
+        break;
+      case 25: //CPU Load min
+        printRight3(6, 1, value);
+        break;
+      case 26: //CPU Load max
+        printRight3(16, 1, value);
+        break;
+      case 27: //CPU Load average
+        printRight3(11, 1, value);
+        break;
+      case 28: //CPU Temp max
+        lcd.setCursor(5,2);
+        if (value < 10) lcd.print(" ");
+        lcd.print(value);
+        break;
+      case 29: //GPU Load max
+        printRight3(17, 2, value);
+        break;
+    }
+  }
+}
+
+//Drop a stray byte between binary frames, but still act on the disconnect and the hello
+bool readStrayByte(byte c){
+  memmove(strayTail, strayTail + 1, 3);
+  strayTail[3] = (char)c;
+  if (strcmp(strayTail, "DISa") == 0) {
+    binarySeen = false;
+    historyPage = false;
+    inData = "";
+    clearScreen();
+  } else if (strcmp(strayTail, "HWBz") == 0) {
+    sendHello();
+  }
+  return true;
+}
+
+//Feed one byte to the binary frame decoder, returns false if it is legacy text
+bool readFrameByte(byte c){
+  unsigned long gap = millis() - lastFrameByte;
+  //Drop a partial frame if the rest never arrived
+  if (frameLen > 0 && gap > FRAME_TIMEOUT_MS) frameLen = 0;
+  lastFrameByte = millis();
+
+  if (frameLen == 0) {
+    if (c != FRAME_START) {
+      //Payload bytes after a desync (e.g. loads of 97-100 are 'a'-'d') must not be drawn as letter fields
+      if (binarySeen && gap <= STRAY_IDLE_MS) return readStrayByte(c);
+      binarySeen = false;
+      return false;
+    }
+    frameBuf[0] = c;
+    frameLen = 1;
+    frameExpected = 0;
+    return true;
+  }
+
+  frameBuf[frameLen++] = c;
+  if (frameLen == 2 && c != FRAME_VERSION) {
+    frameLen = 0; //Unknown version, wait for the next start byte
+    return true;
+  }
+  if (frameLen == FRAME_HEADER) {
+    unsigned long bitmap = (unsigned long)frameBuf[3] | ((unsigned long)frameBuf[4] << 8) |
+                           ((unsigned long)frameBuf[5] << 16) | ((unsigned long)frameBuf[6] << 24);
+    frameExpected = FRAME_HEADER + 1;
+    for (byte i = 0; i < FRAME_FIELDS; i++) {
+      if (bitmap & (1UL << i)) frameExpected += fieldWidth[i];
+    }
+  }
+  if (frameExpected > 0 && frameLen == frameExpected) {
+    if (crc8(frameBuf + 1, frameLen - 2) == frameBuf[frameLen - 1]) {
+      binarySeen = true;
+      applyFrame();
+    } else {
+      Serial.print("K\n"); //Ask the host for a keyframe
+    }
+    frameLen = 0;
+  }
+  return true;
+}
+
 //Reset Screen Function
 void clearScreen(){
   lcd.clear();
@@ -134,14 +385,53 @@ void setup() {
   lcd.createChar(6, eightyfive);
   lcd.createChar(7, onehundred);
   Serial.begin(9600);
+#if BACKLIGHT_BUTTON_PIN >= 0
+  pinMode(BACKLIGHT_BUTTON_PIN, INPUT_PULLUP);
+#endif
   clearScreen();
+  //Announce the protocol at boot, so a host that skipped the negotiation knows it right away
+  sendHello();
+}
+
+//Report the backlight state to the host
+void sendDisplayState() {
+  Serial.print(displayOn ? "D1\n" : "D0\n");
+}
+
+//Answer the binary protocol negotiation (also sent unasked at boot)
+void sendHello() {
+  Serial.print("HWB");
+  Serial.print(FRAME_VERSION);
+  Serial.print("\n");
+  sendDisplayState();
+}
+
+//Toggle the backlight when the button is pressed
+void checkBacklightButton() {
+#if BACKLIGHT_BUTTON_PIN >= 0
+  byte state = digitalRead(BACKLIGHT_BUTTON_PIN);
+  if (state != lastButton && millis() - lastButtonChange > DEBOUNCE_MS) {
+    lastButtonChange = millis();
+    lastButton = state;
+    if (state == LOW) {
+      displayOn = !displayOn;
+      if (displayOn) lcd.backlight();
+      else lcd.noBacklight();
+      sendDisplayState();
+    }
+  }
+#endif
 }
 
 //Main Loop
 void loop() {
+    checkBacklightButton();
     while (Serial.available() > 0)
     {
-      char recieved = Serial.read();
+      int c = Serial.read();
+      if (readFrameByte((byte)c)) continue;
+
+      char recieved = (char)c;
       inData += recieved;
 
       if (recieved == 'a')
@@ -161,6 +451,7 @@ void loop() {
             // IF DIS Clear screen and reset data
             if(inData == "DIS")
             {
+              historyPage = false;
               clearScreen();
             }
 
@@ -355,6 +646,13 @@ void loop() {
      if (recieved == 'z')
         {
           inData.remove(inData.length() - 1, 1);
+          //Binary protocol negotiation from the host
+          if (inData == "HWB")
+          {
+            sendHello();
+            inData = "";
+            continue;
+          }
           lcd.setCursor(12,0);
           if (inData.toInt() == 0) lcd.write(byte(0));
           else if (inData.toInt() < 14) lcd.write(byte(1));
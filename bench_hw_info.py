@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the hardware collection and frame encoding hot path.
+
+Every HardwareMonitor collector and encoder is timed on its own and as a
+whole tick, against a fixture tree for /proc and /sys and stub 'sensors' /
+'nvidia-smi' binaries, so the results do not depend on the hardware of the
+machine running it. It reports p50/p99 latency, syscalls (reads, writes,
+opens, stats, directory listings and spawns) and peak allocated memory per
+call, and fails on regressions against
+bench_baseline.json.
+"""
+
+import functools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import arduino_hw_info
+from arduino_hw_info import (SYSFS_GPU_DRIVERS, BinaryFrameEncoder, FrameTimeWindow, HardwareMonitor,
+                             MangoHudLogSource, NvidiaSmiStream, drm_cards, percentile)
+
+BASELINE_PATH = Path(__file__).with_name('bench_baseline.json')
+
+# Allowed growth before a result counts as a regression
+LATENCY_TOLERANCE = 3.0  # p99 may be this many times the baseline (machines differ)
+LATENCY_SLACK = 0.0005  # Plus this many seconds, so sub-millisecond noise is ignored
+SYSCALL_SLACK = 0  # Syscalls per call are exact, a single extra open or stat is a regression
+ALLOC_TOLERANCE = 1.5
+ALLOC_SLACK = 4096
+
+SENSORS_OUTPUT = """\
+k10temp-pci-00c3
+Adapter: PCI adapter
+Tctl:         +52.6°C
+Tccd1:        +44.8°C
+
+nvme-pci-0100
+Adapter: PCI adapter
+Composite:    +38.9°C  (low  = -273.1°C, high = +84.8°C)
+                       (crit = +84.8°C)
+
+nct6798-isa-0290
+Adapter: ISA adapter
+SYSTIN:        +33.0°C  (high = +80.0°C, hyst = +75.0°C)  sensor = thermistor
+CPUTIN:        +40.5°C  (high = +80.0°C, hyst = +75.0°C)  sensor = thermistor
+"""
+NVIDIA_SMI_OUTPUT = "48, 7, 3, 1024, 8192, 210, 405\n"
+NVIDIA_SMI_STREAM_LINES = 5
+# Start of a MangoHud per-frame log: system info, separator, column header, then one row per frame
+MANGOHUD_LOG = """\
+os,cpu,gpu,ram,kernel,driver,cpuscheduler
+Arch Linux,AMD Ryzen 7 5800X 8-Core Processor,AMD Radeon RX 6800 XT,32768,6.9.7-arch1-1,Mesa 24.1.2,
+--------------------FRAME METRICS--------------------
+fps,frametime,cpu_load,gpu_load,cpu_temp,gpu_temp,gpu_core_clock,gpu_mem_clock,gpu_vram_used,gpu_power,ram_used,\
+swap_used,process_rss,elapsed
+147.213,6.79287,20,96,60,71,2501,1000,6.1,248,12.4,0,2.3,1040253
+146.536,6.82427,18,97,61,71,2465,1000,6.1,253,12.4,0,2.3,1047077
+145.696,6.86363,21,93,63,71,2501,1000,6.1,248,12.4,0,2.3,1053940
+137.730,7.26059,27,93,63,71,2465,1000,6.1,247,12.4,0,2.3,1061200
+143.524,6.96750,20,95,63,71,2501,1000,6.1,248,12.4,0,2.3,1068167
+143.304,6.97819,26,99,61,71,2501,1000,6.1,256,12.4,0,2.3,1075145
+142.264,7.02919,23,93,60,73,2465,1000,6.1,256,12.4,0,2.3,1082174
+149.154,6.70447,26,96,62,72,2501,1000,6.1,254,12.4,0,2.3,1088878
+146.602,6.82119,21,99,61,73,2465,1000,6.1,248,12.4,0,2.3,1095699
+143.250,6.98082,26,96,62,73,2487,1000,6.1,251,12.4,0,2.3,1102679
+142.720,7.00672,19,93,63,71,2487,1000,6.1,249,12.4,0,2.3,1109685
+137.932,7.24995,24,93,60,73,2501,1000,6.1,252,12.4,0,2.3,1116934
+146.949,6.80509,23,97,63,73,2487,1000,6.1,248,12.4,0,2.3,1123739
+32.051,31.20000,22,96,60,71,2501,1000,6.1,258,12.4,0,2.3,1154939
+147.445,6.78221,27,98,63,72,2501,1000,6.1,253,12.4,0,2.3,1161721
+138.595,7.21528,23,93,63,72,2465,1000,6.1,256,12.4,0,2.3,1168936
+150.652,6.63782,18,94,62,71,2501,1000,6.1,250,12.4,0,2.3,1175573
+146.019,6.84842,25,93,61,72,2487,1000,6.1,255,12.4,0,2.3,1182421
+147.964,6.75838,20,99,63,73,2487,1000,6.1,258,12.4,0,2.3,1189179
+145.741,6.86147,23,98,63,71,2465,1000,6.1,248,12.4,0,2.3,1196040
+149.652,6.68216,21,98,61,71,2487,1000,6.1,256,12.4,0,2.3,1202722
+149.549,6.68676,22,93,61,72,2501,1000,6.1,252,12.4,0,2.3,1209408
+142.707,7.00736,23,94,60,72,2501,1000,6.1,255,12.4,0,2.3,1216415
+146.107,6.84428,24,96,60,72,2501,1000,6.1,253,12.4,0,2.3,1223259
+"""
+MANGOHUD_LOG_HEADER_LINES = 4
+
+
+def write_file(path, content):
+    """Write a fixture file, creating its directory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def build_fixture(root, cores):
+    """Create a /proc and /sys fixture tree for a machine with the given number of cores."""
+    root = Path(root)
+
+    # /proc/stat: aggregate row, one row per core, then the non-cpu rows
+    rows = []
+    for cpu in range(cores):
+        user, system = 120000 + 37 * cpu, 40000 + 11 * cpu
+        rows.append(f"cpu{cpu} {user} 310 {system} 9800000 5200 0 1400 0 0 0")
+    total = [sum(int(row.split()[i]) for row in rows) for i in range(1, 11)]
+    stat = "cpu  " + " ".join(map(str, total)) + "\n" + "\n".join(rows) + "\n"
+    stat += "intr 123456789 " + " ".join(["0"] * 256) + "\nctxt 987654321\nbtime 1700000000\n"
+    write_file(root / 'proc/stat', stat)
+
+    # hwmon: k10temp (Tctl), nvme, and a Super I/O chip with CPUTIN
+    hwmon = root / 'sys/class/hwmon'
+    chips = [
+        ('k10temp', [('Tctl', 52625), ('Tccd1', 44750)]),
+        ('nvme', [('Composite', 38850)]),
+        ('nct6798', [('SYSTIN', 33000), ('CPUTIN', 40500)]),
+    ]
+    for index, (name, channels) in enumerate(chips):
+        write_file(hwmon / f'hwmon{index}/name', name + "\n")
+        for channel, (label, millidegrees) in enumerate(channels, start=1):
+            write_file(hwmon / f'hwmon{index}/temp{channel}_label', label + "\n")
+            write_file(hwmon / f'hwmon{index}/temp{channel}_input', f"{millidegrees}\n")
+
+    # Thermal zones: a few unrelated ones and a CPU zone
+    thermal = root / 'sys/class/thermal'
+    for index, (zone_type, millidegrees) in enumerate([('acpitz', 16800), ('iwlwifi_1', 41000),
+                                                       ('TCPU', 50000)]):
+        write_file(thermal / f'thermal_zone{index}/type', zone_type + "\n")
+        write_file(thermal / f'thermal_zone{index}/temp', f"{millidegrees}\n")
+
+    # cpufreq
+    cpu_root = root / 'sys/devices/system/cpu'
+    write_file(cpu_root / 'online', f"0-{cores - 1}\n")
+    for cpu in range(cores):
+        write_file(cpu_root / f'cpu{cpu}/cpufreq/scaling_cur_freq', f"{2800000 + 13000 * cpu}\n")
+
+    # DRM cards: a discrete amdgpu card and an integrated i915 one, plus a connector to skip
+    drm = root / 'sys/class/drm'
+    drivers = root / 'sys/bus/pci/drivers'
+    amd = drm / 'card0/device'
+    write_file(amd / 'gpu_busy_percent', "37\n")
+    write_file(amd / 'mem_info_vram_used', f"{1536 * 1048576}\n")
+    write_file(amd / 'mem_info_vram_total', f"{8192 * 1048576}\n")
+    write_file(amd / 'pp_dpm_sclk', "0: 500Mhz\n1: 1850Mhz *\n2: 2600Mhz\n")
+    write_file(amd / 'pp_dpm_mclk', "0: 96Mhz\n1: 1000Mhz *\n")
+    write_file(amd / 'hwmon/hwmon9/temp1_input', "51000\n")
+    intel = drm / 'card1'
+    write_file(intel / 'gt_act_freq_mhz', "1150\n")
+    write_file(intel / 'gt/gt0/rc6_residency_ms', "123456\n")
+    (intel / 'device').mkdir(parents=True, exist_ok=True)
+    (drm / 'card1-eDP-1').mkdir(parents=True, exist_ok=True)
+    for card, driver in [('card0', 'amdgpu'), ('card1', 'i915')]:
+        (drivers / driver).mkdir(parents=True, exist_ok=True)
+        (drm / card / 'device/driver').symlink_to(drivers / driver)
+
+    write_file(root / 'sensors.txt', SENSORS_OUTPUT)
+    write_file(root / 'nvidia-smi.txt', NVIDIA_SMI_OUTPUT)
+
+
+def record_fixture(root):
+    """Copy the files the collectors read from the running machine into a fixture tree."""
+    root = Path(root)
+    patterns = [
+        '/proc/stat',
+        '/sys/class/hwmon/hwmon*/name',
+        '/sys/class/hwmon/hwmon*/temp*_label',
+        '/sys/class/hwmon/hwmon*/temp*_input',
+        '/sys/class/thermal/thermal_zone*/type',
+        '/sys/class/thermal/thermal_zone*/temp',
+        '/sys/devices/system/cpu/online',
+        '/sys/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_cur_freq',
+        '/sys/class/drm/card[0-9]*/device/gpu_busy_percent',
+        '/sys/class/drm/card[0-9]*/device/mem_info_vram_*',
+        '/sys/class/drm/card[0-9]*/device/pp_dpm_[sm]clk',
+        '/sys/class/drm/card[0-9]*/device/hwmon/hwmon*/temp1_input',
+        '/sys/class/drm/card[0-9]*/gt_act_freq_mhz',
+        '/sys/class/drm/card[0-9]*/gt/gt0/rc6_residency_ms',
+    ]
+    for pattern in patterns:
+        for source in Path('/').glob(pattern.lstrip('/')):
+            try:
+                write_file(root / str(source).lstrip('/'), source.read_text())
+            except OSError:
+                continue
+
+    # The GPU backends are chosen by the name of the card's driver symlink
+    for source in Path('/sys/class/drm').glob('card[0-9]*/device/driver'):
+        driver = root / 'sys/bus/pci/drivers' / os.path.basename(os.readlink(source))
+        driver.mkdir(parents=True, exist_ok=True)
+        link = root / str(source).lstrip('/')
+        link.parent.mkdir(parents=True, exist_ok=True)
+        if not link.is_symlink():
+            link.symlink_to(driver)
+
+    for command, output in [(['sensors'], 'sensors.txt'),
+                            (['nvidia-smi', arduino_hw_info.NVIDIA_SMI_QUERY, '--format=csv,noheader,nounits'],
+                             'nvidia-smi.txt')]:
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=5)
+            write_file(root / output, result.stdout)
+        except (OSError, subprocess.TimeoutExpired):
+            write_file(root / output, "")
+
+
+def install_stub_binaries(root, bin_dir):
+    """Create 'sensors' and 'nvidia-smi' stubs printing the fixture output and put them first on PATH.
+
+    With -lms the nvidia-smi stub prints its line every interval like the
+    real one, and exits after NVIDIA_SMI_STREAM_LINES lines as if it
+    crashed, so NvidiaSmiStream has to restart it.
+    """
+    for name in ['sensors', 'nvidia-smi']:
+        output = Path(root) / (name + '.txt')
+        script = f"#!/bin/sh\ncat '{output}'\n"
+        if name == 'nvidia-smi':
+            script = (f"#!/bin/sh\n"
+                      f"if [ \"$3\" = -lms ]; then\n"
+                      f"    delay=$(awk \"BEGIN {{ print $4 / 1000 }}\")\n"
+                      f"    for i in $(seq {NVIDIA_SMI_STREAM_LINES}); do cat '{output}'; sleep \"$delay\"; done\n"
+                      f"    exit 1\n"
+                      f"fi\n"
+                      f"cat '{output}'\n")
+        stub = Path(bin_dir) / name
+        stub.write_text(script)
+        stub.chmod(0o755)
+    os.environ['PATH'] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+
+
+def wait_until(condition, timeout):
+    """Poll condition() until it holds; return False on timeout."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def check_nvidia_stream(interval=50):
+    """Run NvidiaSmiStream against the streaming stub; return its restarts or raise RuntimeError.
+
+    Samples must arrive, the exiting child must be restarted, stop() must
+    reap both the reader and the child, and a restarted stream must get
+    fresh samples again.
+    """
+    stream = NvidiaSmiStream(interval=interval)
+    stream.start()
+    try:
+        if not wait_until(lambda: stream.restarts >= 1 and stream.latest()[0] is not None, 5):
+            raise RuntimeError(f"nvidia-smi stream: no sample or restart (restarts: {stream.restarts})")
+        sample, age = stream.latest()
+        if sample['temp'] != 48 or age > 1.0:
+            raise RuntimeError(f"nvidia-smi stream: unexpected sample {sample} ({age:.2f} s old)")
+    finally:
+        stream.stop()
+    if stream.thread.is_alive() or (stream.process and stream.process.poll() is None):
+        raise RuntimeError("nvidia-smi stream: reader or child still running after stop()")
+
+    # A restarted stream gets fresh samples again
+    stopped = time.monotonic()
+    stream.start()
+    try:
+        if not wait_until(lambda: stream.sample_time is not None and stream.sample_time > stopped, 5):
+            raise RuntimeError("nvidia-smi stream: no sample after restarting")
+    finally:
+        stream.stop()
+    return stream.restarts
+
+
+# /proc/self/io only counts read and write calls; these audit events add the
+# opens, directory listings, mappings and process spawns
+FILE_CALL_EVENTS = {'open', 'os.listdir', 'os.scandir', 'os.truncate', 'mmap.__new__',
+                    'subprocess.Popen', 'os.posix_spawn', 'os.fork', 'os.exec'}
+STAT_FUNCTIONS = ['stat', 'lstat', 'access']  # These raise no audit event, so they are wrapped
+file_calls = 0
+counting_file_calls = False
+
+
+def audit_file_calls(event, args):
+    """Audit hook counting the FILE_CALL_EVENTS while counting_file_calls is set."""
+    global file_calls
+    if counting_file_calls and event in FILE_CALL_EVENTS:
+        file_calls += 1
+
+
+def counted_stat(func):
+    """Wrap an os stat function so its calls are counted while counting_file_calls is set."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global file_calls
+        if counting_file_calls:
+            file_calls += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def count_file_calls(enabled):
+    """Start or stop counting opens and stats, the stat wrappers are only installed meanwhile."""
+    global counting_file_calls
+    counting_file_calls = enabled
+    for name in STAT_FUNCTIONS:
+        func = getattr(os, name)
+        setattr(os, name, counted_stat(func) if enabled else func.__wrapped__)
+
+
+def read_syscalls():
+    """Return the number of syscalls made by this process so far (while counting file calls)."""
+    counts = {}
+    with open('/proc/self/io') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            counts[key] = int(value)
+    return counts.get('syscr', 0) + counts.get('syscw', 0) + file_calls
+
+
+def measure(func, iterations):
+    """Time func and count its syscalls and peak allocations per call."""
+    func()  # Warm up: discovery, opening descriptors, first /proc/stat sample
+
+    durations = []
+    count_file_calls(True)
+    try:
+        overhead = -read_syscalls() + read_syscalls()  # Of reading /proc/self/io itself
+        syscalls_before = read_syscalls()
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - started)
+        syscalls = (read_syscalls() - syscalls_before - overhead) / iterations
+    finally:
+        count_file_calls(False)
+
+    # Separate pass, tracemalloc slows every allocation down
+    tracemalloc.start()
+    alloc_peak = 0
+    for _ in range(min(iterations, 50)):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        alloc_peak = max(alloc_peak, tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    durations.sort()
+    return {
+        'p50': percentile(durations, 0.50),
+        'p99': percentile(durations, 0.99),
+        'syscalls': syscalls,
+        'alloc_peak': alloc_peak,
+    }
+
+
+def frame_window_feeder():
+    """Return a function feeding 250 ms batches of a ~100 FPS game into a FrameTimeWindow, as a source does."""
+    window = FrameTimeWindow()
+    batch = [10.0 + (i % 7) * 0.3 for i in range(25)]
+    clock = [0.0]
+
+    def feed():
+        clock[0] += 0.25
+        window.add(batch, now=clock[0])
+    return feed
+
+
+def mangohud_replayer(directory, chunk=61):
+    """Return a function replaying MANGOHUD_LOG through MangoHudLogSource.consume, in chunks that split rows.
+
+    The log is first opened in the middle of a row, as when the game was
+    already running, and that pass is checked against the recorded frame
+    times before anything is timed.
+    """
+    lines = MANGOHUD_LOG.splitlines(keepends=True)
+    header, rows = ''.join(lines[:MANGOHUD_LOG_HEADER_LINES]), lines[MANGOHUD_LOG_HEADER_LINES:]
+    write_file(Path(directory) / 'Game_2024-06-30_20-14-02.csv', header + rows[0][:10])
+
+    source = MangoHudLogSource(directory)
+    source.open_log(source.newest_log())
+    rest = rows[0][10:] + ''.join(rows[1:])
+    for start in range(0, len(rest), chunk):
+        source.consume(rest[start:start + chunk])
+    source.close_log()
+    expected = [float(row.split(',')[1]) for row in rows[1:]]  # The row cut in half is skipped
+    replayed = [frametime for _, frametime in source.window.frames]
+    if source.column != 1 or replayed != expected:
+        raise RuntimeError(f"MangoHud replay read {replayed} from column {source.column}, expected {expected}")
+
+    body = ''.join(rows)
+    chunks = [body[start:start + chunk] for start in range(0, len(body), chunk)]
+    position = [0]
+
+    def replay():
+        source.consume(chunks[position[0]])
+        position[0] = (position[0] + 1) % len(chunks)
+    return replay
+
+
+def benchmarks(monitor, drm_root, mangohud_dir):
+    """Return the benchmarked functions, keyed by name."""
+    encoder = BinaryFrameEncoder()
+    gpu_backends = {f"gpu_{driver}": SYSFS_GPU_DRIVERS[driver](card)
+                    for card, driver in drm_cards(drm_root) if driver in SYSFS_GPU_DRIVERS}
+
+    def tick():
+        monitor.get_system_info()
+        monitor.get_formatted_data()
+
+    return {
+        'get_cpu_temperature_hwmon': monitor.get_cpu_temperature_hwmon,
+        'get_cpu_temperature_sensors': monitor.get_cpu_temperature_sensors,
+        'get_cpu_temperature_thermal_zones': monitor.get_cpu_temperature_thermal_zones,
+        'get_cpu_info': monitor.get_cpu_info,
+        'get_cpu_loads': monitor.get_cpu_loads,
+        'get_gpu_info': monitor.get_gpu_info,
+        **{name: backend.read for name, backend in gpu_backends.items()},
+        'fps_window': frame_window_feeder(),
+        'mangohud_log': mangohud_replayer(mangohud_dir),
+        'get_formatted_data': monitor.get_formatted_data,
+        'binary_frame': lambda: encoder.encode(monitor.snapshot()),
+        'tick': tick,
+    }
+
+
+def check_regressions(results, baseline, latency_tolerance):
+    """Return a list of regression messages against the baseline results."""
+    failures = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['p99'] > base['p99'] * latency_tolerance + LATENCY_SLACK:
+            failures.append(f"{name}: p99 {result['p99'] * 1000:.3f} ms (baseline {base['p99'] * 1000:.3f} ms)")
+        if result['syscalls'] > base['syscalls'] + SYSCALL_SLACK:
+            failures.append(f"{name}: {result['syscalls']:.1f} syscalls/call (baseline {base['syscalls']:.1f})")
+        if result['alloc_peak'] > base['alloc_peak'] * ALLOC_TOLERANCE + ALLOC_SLACK:
+            failures.append(f"{name}: peak allocation {result['alloc_peak']} B (baseline {base['alloc_peak']} B)")
+    return failures
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the hardware collection and encode hot path')
+    parser.add_argument('--iterations', '-n', type=int, default=200, help='Calls per benchmark (default: 200)')
+    parser.add_argument('--cores', type=int, default=16, help='Cores of the generated fixture (default: 16)')
+    parser.add_argument('--fixtures', help='Use this fixture tree instead of generating one')
+    parser.add_argument('--record', metavar='DIR', help='Record a fixture tree from this machine and exit')
+    parser.add_argument('--update-baseline', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--latency-tolerance', type=float, default=LATENCY_TOLERANCE,
+                        help=f'Allowed p99 ratio against the baseline (default: {LATENCY_TOLERANCE})')
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixture(args.record)
+        print(f"Recorded fixture tree in {args.record}")
+        return
+
+    sys.addaudithook(audit_file_calls)
+    workdir = tempfile.mkdtemp(prefix='hwbench-')
+    try:
+        fixtures = args.fixtures or os.path.join(workdir, 'fixtures')
+        if not args.fixtures:
+            build_fixture(fixtures, args.cores)
+        bin_dir = os.path.join(workdir, 'bin')
+        os.mkdir(bin_dir)
+        install_stub_binaries(fixtures, bin_dir)
+        if not args.fixtures:  # Recorded trees may have no (or another) nvidia-smi output
+            print(f"nvidia-smi stream: restarted {check_nvidia_stream()} times, stopped cleanly")
+
+        monitor = HardwareMonitor(sysfs_root=os.path.join(fixtures, 'sys'),
+                                  procfs_root=os.path.join(fixtures, 'proc'))
+        results = {}
+        print(f"{'benchmark':36} {'p50 ms':>9} {'p99 ms':>9} {'syscalls':>9} {'peak KiB':>9}")
+        for name, func in benchmarks(monitor, os.path.join(fixtures, 'sys/class/drm'),
+                                     os.path.join(workdir, 'mangohud')).items():
+            result = results[name] = measure(func, args.iterations)
+            print(f"{name:36} {result['p50'] * 1000:9.3f} {result['p99'] * 1000:9.3f} "
+                  f"{result['syscalls']:9.1f} {result['alloc_peak'] / 1024:9.1f}")
+        monitor.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Baselines only make sense for the same fixture
+    key = 'custom' if args.fixtures else f"cores-{args.cores}"
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+
+    if args.update_baseline:
+        baseline[key] = results
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline '{key}' written to {BASELINE_PATH}")
+        return
+
+    if key not in baseline:
+        print(f"No baseline '{key}' to compare against (run with --update-baseline)")
+        return
+
+    failures = check_regressions(results, baseline[key], args.latency_tolerance)
+    if failures:
+        print("\nRegressions against the baseline:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
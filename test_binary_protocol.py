@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Round-trip test of the binary frame format: frames from BinaryFrameEncoder are
+decoded the way arduino_sketch.ino does (readFrameByte/applyFrame) and must
+reproduce the encoded values.
+Run with python3 test_binary_protocol.py (or pytest).
+"""
+
+from arduino_hw_info import (BINARY_FIELDS, BINARY_FLAG_HISTORY_PAGE, BINARY_FLAG_KEYFRAME, BINARY_HEADER,
+                             BINARY_HISTORY_FIELDS, BINARY_LIVE_FIELDS, BINARY_START, BINARY_VERSION_FIELDS,
+                             BinaryFrameEncoder, binary_field_values, crc8)
+
+
+class FrameDecoder:
+    """Host-side copy of the sketch's frame decoder, keeping the values it would draw."""
+
+    def __init__(self):
+        self.values = [None] * len(BINARY_FIELDS)
+        self.history_page = False
+        self.resyncs = 0  # "K" replies after a CRC error
+
+    def feed(self, data):
+        """Decode every complete frame in data, returns the number applied."""
+        applied = 0
+        position = 0
+        while position < len(data):
+            if data[position] != BINARY_START:
+                position += 1
+                continue
+            header = data[position:position + BINARY_HEADER.size]
+            if len(header) < BINARY_HEADER.size:
+                break
+            _, version, flags, bitmap = BINARY_HEADER.unpack(header)
+            if version not in BINARY_VERSION_FIELDS:
+                position += 1
+                continue
+            fields = [bit for bit in range(BINARY_VERSION_FIELDS[version]) if bitmap >> bit & 1]
+            end = position + BINARY_HEADER.size + sum(BINARY_FIELDS[bit][2] for bit in fields)
+            if end >= len(data):
+                break
+            if crc8(data[position + 1:end]) != data[end]:
+                self.resyncs += 1
+                position = end + 1
+                continue
+            offset = position + BINARY_HEADER.size
+            for bit in fields:
+                size = BINARY_FIELDS[bit][2]
+                self.values[bit] = int.from_bytes(data[offset:offset + size], 'little')
+                offset += size
+            self.history_page = bool(flags & BINARY_FLAG_HISTORY_PAGE)
+            applied += 1
+            position = end + 1
+        return applied
+
+
+def make_snapshot(step=0):
+    """A snapshot with every binary field set, varied by step."""
+    snapshot = {'cpu_loads': [(core * 7 + step) % 101 for core in range(16)]}
+    for index, (key, list_index, size, scale) in enumerate(BINARY_FIELDS[16:]):
+        snapshot[key] = ((index * 13 + step * 3) % (100 if size == 1 else 3000)) / scale
+    return snapshot
+
+
+def expected_values(snapshot, fields):
+    values = binary_field_values(snapshot)
+    return [values[bit] for bit in fields]
+
+
+def decoded_values(decoder, fields):
+    return [decoder.values[bit] for bit in fields]
+
+
+def test_keyframe_round_trip():
+    encoder = BinaryFrameEncoder()
+    decoder = FrameDecoder()
+    snapshot = make_snapshot()
+    frame = encoder.encode(snapshot)
+    assert frame[2] & BINARY_FLAG_KEYFRAME
+    assert decoder.feed(frame) == 1
+    assert decoded_values(decoder, BINARY_LIVE_FIELDS) == expected_values(snapshot, BINARY_LIVE_FIELDS)
+
+
+def test_delta_frames_round_trip():
+    encoder = BinaryFrameEncoder(keyframe_interval=100)
+    decoder = FrameDecoder()
+    for step in range(20):
+        snapshot = make_snapshot(step)
+        frame = encoder.encode(snapshot)
+        if step:
+            assert not frame[2] & BINARY_FLAG_KEYFRAME
+        assert decoder.feed(frame) == 1
+        assert decoded_values(decoder, BINARY_LIVE_FIELDS) == expected_values(snapshot, BINARY_LIVE_FIELDS)
+
+
+def test_unchanged_snapshot_sends_no_fields():
+    encoder = BinaryFrameEncoder()
+    snapshot = make_snapshot()
+    encoder.encode(snapshot)
+    frame = encoder.encode(snapshot)
+    assert len(frame) == BINARY_HEADER.size + 1
+    assert BINARY_HEADER.unpack(frame[:BINARY_HEADER.size])[3] == 0
+
+
+def test_history_page_round_trip():
+    encoder = BinaryFrameEncoder()
+    decoder = FrameDecoder()
+    snapshot = make_snapshot(5)
+    decoder.feed(encoder.encode(snapshot, history_page=True))
+    assert decoder.history_page
+    assert decoded_values(decoder, BINARY_HISTORY_FIELDS) == expected_values(snapshot, BINARY_HISTORY_FIELDS)
+
+
+def test_version_1_only_sends_live_fields():
+    encoder = BinaryFrameEncoder(version=1)
+    decoder = FrameDecoder()
+    snapshot = make_snapshot(3)
+    frame = encoder.encode(snapshot, history_page=True)
+    assert frame[1] == 1 and not frame[2] & BINARY_FLAG_HISTORY_PAGE
+    decoder.feed(frame)
+    assert decoded_values(decoder, BINARY_LIVE_FIELDS) == expected_values(snapshot, BINARY_LIVE_FIELDS)
+    assert decoded_values(decoder, BINARY_HISTORY_FIELDS) == [None] * len(BINARY_HISTORY_FIELDS)
+
+
+def test_corrupted_frame_is_rejected():
+    encoder = BinaryFrameEncoder()
+    decoder = FrameDecoder()
+    frame = bytearray(encoder.encode(make_snapshot()))
+    frame[BINARY_HEADER.size] ^= 0x01
+    assert decoder.feed(bytes(frame)) == 0
+    assert decoder.resyncs == 1
+    assert decoder.values == [None] * len(BINARY_FIELDS)
+
+
+def test_frames_survive_stray_bytes():
+    encoder = BinaryFrameEncoder()
+    decoder = FrameDecoder()
+    snapshot = make_snapshot(7)
+    assert decoder.feed(b'abcd' + encoder.encode(snapshot)) == 1
+    assert decoded_values(decoder, BINARY_LIVE_FIELDS) == expected_values(snapshot, BINARY_LIVE_FIELDS)
+
+
+def test_discarded_frame_changes_are_resent():
+    encoder = BinaryFrameEncoder(keyframe_interval=100)
+    decoder = FrameDecoder()
+    decoder.feed(encoder.encode(make_snapshot(0)))
+    encoder.encode(make_snapshot(1))  # Dropped before it was written
+    encoder.discard_last()
+    snapshot = make_snapshot(2)
+    decoder.feed(encoder.encode(snapshot))
+    assert decoded_values(decoder, BINARY_LIVE_FIELDS) == expected_values(snapshot, BINARY_LIVE_FIELDS)
+
+
+def test_keyframe_request_resends_everything():
+    encoder = BinaryFrameEncoder(keyframe_interval=100)
+    snapshot = make_snapshot()
+    encoder.encode(snapshot)
+    encoder.request_keyframe()
+    decoder = FrameDecoder()  # A freshly reset sketch
+    frame = encoder.encode(snapshot)
+    assert frame[2] & BINARY_FLAG_KEYFRAME
+    decoder.feed(frame)
+    assert decoded_values(decoder, BINARY_LIVE_FIELDS) == expected_values(snapshot, BINARY_LIVE_FIELDS)
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_') and callable(value)]
+    for test in tests:
+        test()
+        print(f"{test.__name__}: ok")
+    print(f"All {len(tests)} binary protocol tests passed")
+
+
+if __name__ == "__main__":
+    main()